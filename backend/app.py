@@ -3,15 +3,15 @@ import os
 import shutil
 import logging
 from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Form, Query, Body, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, time, timedelta
 from .database import get_document_collection, get_reminder_collection, get_chat_message_collection, get_conversation_collection, get_user_collection, get_person_collection, get_document_chunk_collection, get_document_feedback_collection, pwd_context
 from .models import Document, Reminder, ChatMessage, Conversation, User, Person, DocumentFeedback, FeedbackType, PyObjectId # Import Person and DocumentFeedback models
 from .ocr import extract_text
-from .search import add_to_faiss_index, semantic_search, keyword_search, hybrid_search, delete_from_faiss_index, clear_faiss_index, build_faiss_index, ENABLE_CHUNKING # Added hybrid_search and ENABLE_CHUNKING
+from .search import add_to_faiss_index, semantic_search, keyword_search, hybrid_search, make_search_snippet, delete_from_faiss_index, clear_faiss_index, build_faiss_index, load_or_build_faiss_index, ensure_keyword_text_index, search_cache, ENABLE_CHUNKING # Added hybrid_search and ENABLE_CHUNKING
 from .scheduler import start_scheduler
-from .llm import get_summary_and_category, answer_question, extract_dates_for_reminders, extract_structured_info_with_correction
+from .llm import get_summary_and_category, answer_question, stream_answer_question, extract_dates_for_reminders, extract_structured_info_with_correction
 from bson import ObjectId
 from pymongo.collection import Collection
 from pymongo import ReadPreference
@@ -392,7 +392,9 @@ async def upload_document(
 @app.on_event("startup")
 async def startup_event():
     # Build FAISS index on startup if it doesn't exist or if documents were added/removed
-    build_faiss_index()
+    load_or_build_faiss_index()
+    # Create the keyword search text index here rather than at import, so a slow MongoDB doesn't block importing
+    ensure_keyword_text_index()
     # Start the background reminder scheduler
     start_scheduler()
     # Ensure an admin user exists
@@ -514,6 +516,8 @@ async def delete_document(
     
     # Delete from MongoDB
     result = documents_collection.delete_one({"_id": ObjectId(document_id)})
+    # Cleared again now that the document is gone: a search since the FAISS removal may have cached it
+    search_cache.clear()
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
@@ -547,7 +551,15 @@ async def document_search(
         else:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid search_type. Must be 'keyword' or 'semantic'.")
         
-        return [json_serializable_doc(doc) for doc in results]
+        # Send a snippet around the match instead of the full extracted text; the frontend fetches
+        # GET /documents/{document_id} when the full text is asked for.
+        # Results are copied first since they may be shared with the search cache.
+        response_docs = []
+        for doc in results:
+            doc = dict(doc)
+            doc['snippet'] = make_search_snippet(doc.pop('extracted_text', '') or '', query)
+            response_docs.append(json_serializable_doc(doc))
+        return response_docs
     except Exception as e:
         logger.error(f"Error in document search ({search_type}): {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred during document search: {e}")
@@ -584,6 +596,30 @@ async def question_answering(
         print(f"CRITICAL BACKEND ERROR IN QA: {e}\n{error_trace}") # Print to console for immediate visibility
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred during question answering: {e}")
 
+@app.post("/qa/stream", tags=["search"])
+async def question_answering_stream(
+    document_id: str = Body(..., embed=True),
+    question: str = Body(..., embed=True),
+    documents_collection: Collection = Depends(get_document_collection),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Same as /qa, but streams the answer as plain text while the LLM generates it."""
+    logger.info(f"Received /qa/stream request: document_id='{document_id}', question='{question}'")
+
+    if not ObjectId.is_valid(document_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Document ID format")
+
+    document = documents_collection.find_one({"_id": ObjectId(document_id)}, {"extracted_text": 1})
+    if document is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+    extracted_text = document.get("extracted_text", "")
+    if not extracted_text:
+        return StreamingResponse(iter(["The document has no extracted text to answer the question."]), media_type="text/plain")
+
+    # A sync generator: Starlette iterates it in its threadpool, so the event loop isn't blocked
+    return StreamingResponse(stream_answer_question(question, extracted_text), media_type="text/plain")
+
 # ------------------------------------
 # REMINDER ROUTES
 # ------------------------------------
@@ -618,6 +654,27 @@ async def create_reminder(
     inserted_reminder_doc = reminder_collection.find_one({"_id": result.inserted_id})
     return Reminder(**inserted_reminder_doc)
 
+@app.post("/reminders/batch", response_model=List[Reminder], tags=["reminders"])
+async def create_reminders_batch(
+    reminders: List[Reminder],
+    reminder_collection: Collection = Depends(get_reminder_collection),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Same as POST /reminders/ for several reminders at once: one request and one insert_many
+    if not reminders:
+        return []
+
+    reminder_dicts = []
+    for reminder in reminders:
+        reminder_dict = reminder.model_dump(by_alias=True, exclude_none=False)
+        if '_id' in reminder_dict and reminder_dict['_id'] is None:
+            reminder_dict.pop('_id')
+        reminder_dicts.append(reminder_dict)
+
+    # insert_many sets each dict's _id, so the inserted reminders don't need to be read back
+    reminder_collection.insert_many(reminder_dicts)
+    return [Reminder(**reminder_dict) for reminder_dict in reminder_dicts]
+
 @app.delete("/reminders/{reminder_id}", tags=["reminders"])
 async def delete_reminder(
     reminder_id: str,
@@ -670,6 +727,7 @@ async def start_new_conversation(
 @app.get("/conversations/{conversation_id}/messages", response_model=List[ChatMessage], tags=["chat"])
 async def get_conversation_messages(
     conversation_id: str,
+    after: Optional[str] = Query(None, description="Only return messages newer than the message with this ID"),
     chat_message_collection: Collection = Depends(get_chat_message_collection),
     conversation_collection: Collection = Depends(get_conversation_collection),
     current_user: User = Depends(get_current_active_user)
@@ -686,9 +744,16 @@ async def get_conversation_messages(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found or not owned by user")
         
     # 2. Fetch messages, sorted by timestamp
-    messages = list(chat_message_collection.find(
-        {"conversation_id": ObjectId(conversation_id)}
-    ).sort("timestamp", 1))
+    query = {"conversation_id": ObjectId(conversation_id)}
+    if after is not None:
+        # Lets clients that already hold the conversation fetch only what was added since
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Message ID format")
+        after_doc = chat_message_collection.find_one({"_id": ObjectId(after), "conversation_id": ObjectId(conversation_id)}, {"timestamp": 1})
+        if not after_doc:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found in this conversation")
+        query["timestamp"] = {"$gt": after_doc["timestamp"]}
+    messages = list(chat_message_collection.find(query).sort("timestamp", 1))
     
     # logger.info(f"MongoDB Find Query ObjectId: {ObjectId(conversation_id)}, Type: {type(ObjectId(conversation_id))}")
     
@@ -1003,3 +1068,32 @@ async def delete_uploaded_file(
     except Exception as e:
         logger.error(f"Error deleting file '{filename}' from uploads: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error deleting file: {e}")
+
+@app.post("/files/uploaded/batch-delete", tags=["file-management"])
+async def delete_uploaded_files_batch(
+    filenames: List[str] = Body(..., embed=True),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Deletes several files from the 'uploads' directory in one request.
+    Returns the deleted filenames and, for the rest, why each could not be deleted.
+    """
+    deleted = []
+    failed = []
+    for filename in filenames:
+        # Only plain names inside 'uploads'; anything with a path component is refused
+        if os.path.basename(filename) != filename:
+            failed.append({"filename": filename, "detail": "Invalid filename."})
+            continue
+        file_path = os.path.join("uploads", filename)
+        if not os.path.isfile(file_path):
+            failed.append({"filename": filename, "detail": "File not found in uploads directory."})
+            continue
+        try:
+            os.remove(file_path)
+            logger.info(f"Manually deleted file from uploads: {file_path}")
+            deleted.append(filename)
+        except Exception as e:
+            logger.error(f"Error deleting file '{filename}' from uploads: {e}")
+            failed.append({"filename": filename, "detail": f"Error deleting file: {e}"})
+    return {"deleted": deleted, "failed": failed}
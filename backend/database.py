@@ -84,6 +84,12 @@ def get_document_feedback_collection():
     logger.debug(f"get_document_feedback_collection called. Collection ID: {id(collection)}")
     return collection
 
+# Dependency to get the database collection for cached embeddings
+def get_embedding_cache_collection():
+    collection = db_connection.get_collection("embedding_cache")
+    logger.debug(f"get_embedding_cache_collection called. Collection ID: {id(collection)}")
+    return collection
+
 # User management functions
 def create_user(user: User):
     users_collection = get_user_collection()
@@ -0,0 +1,50 @@
+import hashlib
+import logging
+from typing import List
+
+from pymongo.errors import BulkWriteError
+
+from .database import get_embedding_cache_collection
+from .llm import get_embeddings_batch, OLLAMA_EMBEDDING_MODEL, OLLAMA_MODEL
+
+logger = logging.getLogger(__name__)
+
+def embedding_cache_key(text: str) -> str:
+    """Cache key for a text: sha256 of the embedding model name and the text, so a model switch invalidates it."""
+    model = OLLAMA_EMBEDDING_MODEL if OLLAMA_EMBEDDING_MODEL else OLLAMA_MODEL
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+def get_cached_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Returns embeddings for `texts` (aligned, [] on failure), reusing cached ones and
+    embedding only the texts that are not in the cache yet.
+    """
+    if not texts:
+        return []
+
+    cache_collection = get_embedding_cache_collection()
+    keys = [embedding_cache_key(text) for text in texts]
+    cached = {}
+    try:
+        cached = {entry["_id"]: entry["embedding"] for entry in cache_collection.find({"_id": {"$in": list(set(keys))}})}
+    except Exception as e:
+        logger.error(f"Error reading embedding cache: {e}")
+
+    # Embed each missing text once, even if it occurs several times
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    if missing:
+        new_embeddings = get_embeddings_batch(list(missing.values()))
+        new_entries = [{"_id": key, "embedding": embedding} for key, embedding in zip(missing, new_embeddings) if embedding]
+        cached.update((entry["_id"], entry["embedding"]) for entry in new_entries)
+        if new_entries:
+            try:
+                cache_collection.insert_many(new_entries, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys from a concurrent insert are harmless
+                logger.debug(f"Some embedding cache entries already existed: {e.details.get('writeErrors', [])[:1]}")
+            except Exception as e:
+                logger.error(f"Error writing embedding cache: {e}")
+
+    unique_count = len(set(keys))
+    logger.info(f"Embedding cache: {unique_count - len(missing)} of {unique_count} unique texts were cached.")
+    return [cached.get(key, []) for key in keys]
@@ -1,16 +1,22 @@
 import ollama
 import json
 import re 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 import logging
 import os # Added for environment variable access
+from concurrent.futures import ThreadPoolExecutor
 
 OLLAMA_MODEL = os.getenv('OLLAMA_LLM_MODEL', 'mistral') # Main LLM for Q&A, summary, etc.
 OLLAMA_EMBEDDING_MODEL = os.getenv('OLLAMA_EMBEDDING_MODEL', OLLAMA_MODEL) # Dedicated embedding model, falls back to main LLM model
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64')) # Texts sent per Ollama embed request
+EMBEDDING_MAX_WORKERS = int(os.getenv('EMBEDDING_MAX_WORKERS', '8')) # Concurrent embed requests to Ollama
 
 logger = logging.getLogger(__name__)
 
+# Embedding requests are I/O-bound HTTP calls, so batches are sent to Ollama from a shared thread pool
+_embedding_executor = ThreadPoolExecutor(max_workers=EMBEDDING_MAX_WORKERS, thread_name_prefix="embed")
+
 # --- NEW SECTION: STRICT REGEX PATTERNS FOR POST-PROCESSING ---
 # These patterns are designed to be highly specific to prevent false positives.
 STRICT_REGEX_PATTERNS = {
@@ -52,6 +58,32 @@ def get_embedding(text: str):
         logger.error(f"Error getting embedding from Ollama for text: {text[:50]}... using model '{model_to_use}'. Error: {e}")
         return []
 
+def _embed_batch(batch: List[str]) -> List[List[float]]:
+    """Embeds one batch with a single Ollama request, falling back to per-text requests on failure."""
+    model_to_use = OLLAMA_EMBEDDING_MODEL if OLLAMA_EMBEDDING_MODEL else OLLAMA_MODEL
+    try:
+        response = ollama.embed(model=model_to_use, input=batch)
+        batch_embeddings = response["embeddings"]
+        if len(batch_embeddings) != len(batch):
+            raise ValueError(f"expected {len(batch)} embeddings, got {len(batch_embeddings)}")
+        logger.debug(f"Generated {len(batch)} embeddings in one request using model '{model_to_use}'.")
+        return batch_embeddings
+    except Exception as e:
+        logger.warning(f"Batch embedding request failed using model '{model_to_use}'. Falling back to per-text requests. Error: {e}")
+        return [get_embedding(text) for text in batch]
+
+def get_embeddings_batch(texts: List[str]) -> List[List[float]]:
+    """
+    Generates embeddings for many texts with one Ollama request per EMBEDDING_BATCH_SIZE texts,
+    up to EMBEDDING_MAX_WORKERS requests in flight at once.
+    The result is aligned with `texts`; an entry is [] if its embedding could not be generated.
+    """
+    batches = [texts[start:start + EMBEDDING_BATCH_SIZE] for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+    embeddings = []
+    for batch_embeddings in _embedding_executor.map(_embed_batch, batches): # map preserves batch order
+        embeddings.extend(batch_embeddings)
+    return embeddings
+
 def get_summary_and_category(text: str) -> Dict[str, Optional[str]]:
     """
     Generates a summary and suggests a category for a document.
@@ -165,9 +197,9 @@ def extract_structured_info_with_correction(text: str) -> Dict[str, Any]:
 
 # --- END CRITICAL FUNCTION ---
 
-def answer_question(question: str, document_context: str, chat_history: Optional[str] = None) -> str:
+def _qa_prompt(question: str, document_context: str, chat_history: Optional[str] = None) -> str:
     """
-    Answers a question based on the document context and chat history provided.
+    Builds the Q&A prompt shared by answer_question and stream_answer_question.
     """
     # NOTE: The original modification_file.md indicated custom regex for DL here.
     # The logic below is a standard RAG pattern.
@@ -192,6 +224,13 @@ def answer_question(question: str, document_context: str, chat_history: Optional
     """
     
     logger.info(f"Full Prompt for Q&A: {prompt[:500]}...")
+    return prompt
+
+def answer_question(question: str, document_context: str, chat_history: Optional[str] = None) -> str:
+    """
+    Answers a question based on the document context and chat history provided.
+    """
+    prompt = _qa_prompt(question, document_context, chat_history)
 
     try:
         # Use a more powerful model for reasoning if available, default to Mistral
@@ -203,6 +242,21 @@ def answer_question(question: str, document_context: str, chat_history: Optional
         logger.error(f"Error answering question from Ollama: {e}")
         return "An internal error occurred while trying to answer your question."
 
+def stream_answer_question(question: str, document_context: str, chat_history: Optional[str] = None) -> Iterator[str]:
+    """
+    Same as answer_question, but yields the answer in chunks as Ollama generates them.
+    """
+    prompt = _qa_prompt(question, document_context, chat_history)
+
+    try:
+        for chunk in ollama.generate(model=OLLAMA_MODEL, prompt=prompt, stream=True):
+            if chunk['response']:
+                yield chunk['response']
+    except Exception as e:
+        # The response has already started, so the error can only be reported in the answer itself
+        logger.error(f"Error streaming answer from Ollama: {e}")
+        yield "\n\nAn internal error occurred while trying to answer your question."
+
 def extract_dates_for_reminders(text: str) -> List[Dict[str, str]]:
     """
     Extracts potential dates and associated messages for reminders.
@@ -49,6 +49,7 @@ class DocumentChunk(BaseModel):
     chunk_index: int # Order of the chunk within the document
     content: str # The text content of the chunk
     embedding: List[float] # The embedding vector for this chunk
+    faiss_id: Optional[int] = None # ID of this chunk's vector in the FAISS index
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
@@ -9,13 +9,35 @@ import io
 import numpy as np
 import os # Added for environment variable access
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional # Import Optional
 
+try:
+    from tesserocr import PyTessBaseAPI, OEM # Direct Tesseract bindings (no per-page subprocess)
+except ImportError:
+    PyTessBaseAPI = None
+
 # Configuration for OCR pre-processing and debugging
 ENABLE_OCR_PREPROCESSING = os.getenv('ENABLE_OCR_PREPROCESSING', 'False').lower() == 'true'
 SAVE_OCR_DEBUG_IMAGES = os.getenv('SAVE_OCR_DEBUG_IMAGES', 'False').lower() == 'true'
 OCR_DEBUG_IMAGE_DIR = "ocr_debug_images" # Directory to save debug images
 TESSERACT_PSM = os.getenv('TESSERACT_PSM', '3') # Default PSM to 3 (fully automatic page segmentation)
+# Pages above both thresholds are treated as clean (e.g. born-digital) and skip denoising
+CLEAN_PAGE_LAPLACIAN_VAR = float(os.getenv('CLEAN_PAGE_LAPLACIAN_VAR', '500')) # Minimum sharpness (variance of Laplacian)
+CLEAN_PAGE_INTENSITY_STD = float(os.getenv('CLEAN_PAGE_INTENSITY_STD', '50')) # Minimum contrast (stddev of intensities)
+
+TESSERACT_LANG = "eng+hin+kan"
+# Tesseract language data directory. tesserocr wheels bundle their own libtesseract, which doesn't know
+# where the system's tessdata is installed, so it is passed explicitly when set.
+TESSDATA_PREFIX = os.getenv('TESSDATA_PREFIX')
+# Number of PDF pages OCR'd concurrently (Tesseract releases the GIL while recognizing)
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', str(os.cpu_count() or 1)))
+# Rendered PDF pages held in memory at once (~6 MB each), enough to keep every OCR worker busy
+OCR_PAGES_IN_FLIGHT = 2 * OCR_MAX_WORKERS
+# A PDF text layer shorter than this is treated as missing (scanned PDF) and falls back to OCR
+MIN_PDF_TEXT_LAYER_CHARS = int(os.getenv('MIN_PDF_TEXT_LAYER_CHARS', '50'))
 
 # Create debug image directory if it doesn't exist
 if SAVE_OCR_DEBUG_IMAGES:
@@ -27,6 +49,45 @@ if SAVE_OCR_DEBUG_IMAGES:
 
 # Reverted: Removed deskew_image_min_area_rect function and its calls.
 
+# Persistent Tesseract API per thread, so language data is loaded once per thread instead of per page.
+# The executor is long-lived so its threads (and their APIs) are reused across documents.
+_tess_local = threading.local()
+_ocr_executor = ThreadPoolExecutor(max_workers=OCR_MAX_WORKERS, thread_name_prefix="ocr")
+# Cleared the first time a tesserocr API fails to initialize, so later pages go straight to pytesseract
+_tesserocr_available = PyTessBaseAPI is not None
+
+def _get_tess_api():
+    """Returns the calling thread's tesserocr API, or None if tesserocr is missing or can't initialize."""
+    global _tesserocr_available
+    if not _tesserocr_available:
+        return None
+    api = getattr(_tess_local, "api", None)
+    if api is None:
+        api_kwargs = {"path": TESSDATA_PREFIX} if TESSDATA_PREFIX else {}
+        try:
+            api = PyTessBaseAPI(lang=TESSERACT_LANG, oem=OEM.DEFAULT, psm=int(TESSERACT_PSM), **api_kwargs)
+        except RuntimeError as e:
+            _tesserocr_available = False
+            logging.warning(f"Could not initialize the tesserocr API ({e}). Set TESSDATA_PREFIX to the tessdata directory; using pytesseract instead.")
+            return None
+        _tess_local.api = api
+        logging.info(f"Initialized Tesseract API for thread {threading.current_thread().name} (lang={TESSERACT_LANG}, psm={TESSERACT_PSM}).")
+    return api
+
+def run_tesseract(image: np.ndarray) -> str:
+    """
+    Runs Tesseract OCR on an image array. Uses the calling thread's persistent tesserocr API
+    when available, otherwise falls back to the pytesseract CLI wrapper.
+    """
+    pil_image = Image.fromarray(image)
+    api = _get_tess_api()
+    if api is not None:
+        api.SetImage(pil_image)
+        return api.GetUTF8Text()
+
+    tesseract_config = f'--oem 3 --psm {TESSERACT_PSM} -l {TESSERACT_LANG}'
+    return pytesseract.image_to_string(pil_image, config=tesseract_config)
+
 def preprocess_image_for_ocr(image: np.ndarray) -> np.ndarray:
     """
     Applies a series of image processing steps to enhance OCR accuracy.
@@ -37,13 +98,22 @@ def preprocess_image_for_ocr(image: np.ndarray) -> np.ndarray:
     # 1. Convert to grayscale
     gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # 2. Denoising (Non-local Means Denoising)
-    # Parameters: h (filter strength), hColor (color filter strength), templateWindowSize, searchWindowSize
-    denoised_img = cv2.fastNlMeansDenoising(gray_image, None, 30, 7, 21) # Using grayscale version
+    # Cheap quality proxy: sharp, high-contrast pages don't need denoising
+    laplacian_var = cv2.Laplacian(gray_image, cv2.CV_32F).var()
+    intensity_std = gray_image.std()
+    is_clean_page = laplacian_var > CLEAN_PAGE_LAPLACIAN_VAR and intensity_std > CLEAN_PAGE_INTENSITY_STD
     
-    # 3. Binarization (Adaptive Thresholding)
-    # ADAPTIVE_THRESH_GAUSSIAN_C is generally good for varying lighting
-    binarized_img = cv2.adaptiveThreshold(denoised_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    if is_clean_page:
+        # 2+3. Clean page: global Otsu threshold, no denoising
+        _, binarized_img = cv2.threshold(gray_image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    else:
+        # 2. Denoising (Non-local Means Denoising)
+        # Parameters: h (filter strength), hColor (color filter strength), templateWindowSize, searchWindowSize
+        denoised_img = cv2.fastNlMeansDenoising(gray_image, None, 30, 7, 21) # Using grayscale version
+        
+        # 3. Binarization (Adaptive Thresholding)
+        # ADAPTIVE_THRESH_GAUSSIAN_C is generally good for varying lighting
+        binarized_img = cv2.adaptiveThreshold(denoised_img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
     
     # 4. Skew Correction (Deskewing) - using moments
     coords = np.column_stack(np.where(binarized_img > 0))
@@ -58,7 +128,8 @@ def preprocess_image_for_ocr(image: np.ndarray) -> np.ndarray:
     M = cv2.getRotationMatrix2D(center, angle, 1.0)
     rotated = cv2.warpAffine(binarized_img, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
     
-    logging.debug("Image pre-processed (grayscale, denoised, binarized, deskewed).")
+    # %-style args: the message is only built when DEBUG is enabled (this runs once per page)
+    logging.debug("Image pre-processed (grayscale, %s, deskewed).", 'otsu-binarized' if is_clean_page else 'denoised, binarized')
     return rotated
 
 def extract_text_from_image(file_path: str) -> str:
@@ -75,12 +146,10 @@ def extract_text_from_image(file_path: str) -> str:
             cv2.imwrite(debug_filename, processed_image)
             logging.info(f"Saved processed image for debug: {debug_filename}")
 
-        # --- TESSERACT CONFIG (Using configurable PSM) ---
-        tesseract_config = f'--oem 3 --psm {TESSERACT_PSM} -l eng+hin+kan' 
-        
-        text = pytesseract.image_to_string(Image.fromarray(processed_image), config=tesseract_config)
-        logging.info(f"Tesseract OCR completed for image {file_path} with config: '{tesseract_config}'")
-        # --- END TESSERACT CONFIG ---
+        # --- TESSERACT (Using configurable PSM) ---
+        text = run_tesseract(processed_image)
+        logging.info(f"Tesseract OCR completed for image {file_path} with lang '{TESSERACT_LANG}' and PSM {TESSERACT_PSM}")
+        # --- END TESSERACT ---
 
         return text, None
 
@@ -89,6 +158,19 @@ def extract_text_from_image(file_path: str) -> str:
         logging.error(error_msg)
         return "", error_msg
 
+def _ocr_pdf_page(numpy_img: np.ndarray, page_number: int, file_path: str) -> str:
+    """Pre-processes and OCRs a single rendered PDF page. Runs on an OCR executor thread."""
+    # Apply pre-processing if enabled
+    processed_image = preprocess_image_for_ocr(numpy_img)
+    
+    if SAVE_OCR_DEBUG_IMAGES:
+        debug_filename = os.path.join(OCR_DEBUG_IMAGE_DIR, f"processed_pdf_page_{page_number}_{os.path.basename(file_path)}.png")
+        cv2.imwrite(debug_filename, processed_image)
+        logging.info(f"Saved processed PDF page {page_number} for debug: {debug_filename}")
+
+    # Apply the configurable Tesseract config for PDF OCR fallback
+    return run_tesseract(processed_image)
+
 def extract_text_from_pdf(file_path: str, password: str = None) -> tuple[str, Optional[str]]:
     """Extracts text from a PDF file, falling back to OCR if text extraction fails."""
     full_text = ""
@@ -96,21 +178,7 @@ def extract_text_from_pdf(file_path: str, password: str = None) -> tuple[str, Op
     doc = None # Initialize doc to None for cleanup
 
     try:
-        # First attempt: standard text extraction
-        with pdfplumber.open(file_path, password=password) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n\n"
-        
-        if full_text.strip():
-            logging.info(f"Successfully extracted text from PDF {file_path} using pdfplumber.")
-            return full_text, None
-        
-        # Second attempt: OCR on images/scanned PDF (fallback)
-        logging.warning(f"No text extracted from PDF {file_path} via pdfplumber. Attempting OCR fallback.")
-        
-        # Using PyMuPDF (fitz) for reliable image extraction
+        # Open once with PyMuPDF (fitz); the same document serves text extraction and the OCR fallback
         doc = fitz.open(file_path) 
         
         if doc.is_encrypted:
@@ -120,7 +188,40 @@ def extract_text_from_pdf(file_path: str, password: str = None) -> tuple[str, Op
             if not doc.authenticate(password):
                  raise Exception("PDF is password-protected and the provided password is wrong or ineffective.")
         
+        # First attempt: text layer via fitz (no layout analysis, much faster than pdfplumber)
+        full_text = "\n\n".join(doc.load_page(i).get_text("text") for i in range(doc.page_count))
+        
+        if len(full_text.strip()) >= MIN_PDF_TEXT_LAYER_CHARS:
+            doc.close()
+            logging.info(f"Successfully extracted text from PDF {file_path} using PyMuPDF.")
+            return full_text, None
+        
+        # Second attempt: pdfplumber layout-based extraction, for PDFs where fitz finds (almost) nothing
+        plumber_text = ""
+        with pdfplumber.open(file_path, password=password) as pdf:
+            for i, page in enumerate(pdf.pages):
+                page_text = page.extract_text()
+                if page_text:
+                    plumber_text += page_text + "\n\n"
+        
+        if len(plumber_text.strip()) >= MIN_PDF_TEXT_LAYER_CHARS:
+            doc.close()
+            logging.info(f"Successfully extracted text from PDF {file_path} using pdfplumber.")
+            return plumber_text, None
+        
+        # Third attempt: OCR on images/scanned PDF (fallback)
+        logging.warning(f"No text extracted from PDF {file_path} via PyMuPDF or pdfplumber. Attempting OCR fallback.")
+        # Keep whatever short text layer was found in case OCR finds nothing either
+        text_layer = full_text if full_text.strip() else plumber_text
+        full_text = ""
+        
+        # Pages are rendered here (a fitz document is not thread-safe) and pre-processed + OCR'd in the pool.
+        # The next page is rendered only once the oldest in-flight page is done, so memory is bounded.
+        page_futures = deque()
+        page_texts = []
         for i in range(len(doc)):
+            if len(page_futures) >= OCR_PAGES_IN_FLIGHT:
+                page_texts.append(page_futures.popleft().result())
             page = doc.load_page(i)
             
             # --- DPI settings for OCR ---
@@ -133,21 +234,13 @@ def extract_text_from_pdf(file_path: str, password: str = None) -> tuple[str, Op
 
             # Convert to OpenCV format for pre-processing
             numpy_img = np.array(img)
-            
-            # Apply pre-processing if enabled
-            processed_image = preprocess_image_for_ocr(numpy_img)
-            
-            if SAVE_OCR_DEBUG_IMAGES:
-                debug_filename = os.path.join(OCR_DEBUG_IMAGE_DIR, f"processed_pdf_page_{i+1}_{os.path.basename(file_path)}.png")
-                cv2.imwrite(debug_filename, processed_image)
-                logging.info(f"Saved processed PDF page {i+1} for debug: {debug_filename}")
-
-            # Apply the configurable Tesseract config for PDF OCR fallback
-            tesseract_config = f'--oem 3 --psm {TESSERACT_PSM} -l eng+hin+kan'
-            page_ocr_text = pytesseract.image_to_string(Image.fromarray(processed_image), config=tesseract_config)
-            
+            page_futures.append(_ocr_executor.submit(_ocr_pdf_page, numpy_img, i + 1, file_path))
+        
+        page_texts.extend(future.result() for future in page_futures)
+        
+        for page_number, page_ocr_text in enumerate(page_texts, start=1):
             if page_ocr_text:
-                full_text += f"--- OCR Page {i+1} ---\n" + page_ocr_text + "\n\n"
+                full_text += f"--- OCR Page {page_number} ---\n" + page_ocr_text + "\n\n"
         
         doc.close() # Close document after processing all pages
         
@@ -155,6 +248,10 @@ def extract_text_from_pdf(file_path: str, password: str = None) -> tuple[str, Op
             logging.info(f"Successfully extracted text from PDF {file_path} using OCR fallback with pre-processing {'enabled' if ENABLE_OCR_PREPROCESSING else 'disabled'}.")
             return full_text, None
         
+        if text_layer.strip():
+            logging.info(f"OCR found no text in PDF {file_path}; using its short text layer.")
+            return text_layer, None
+        
         warning_msg = f"Failed to extract any text from PDF {file_path} even with OCR fallback."
         logging.warning(warning_msg)
         return "", warning_msg
@@ -1,39 +1,56 @@
 import schedule
 import time
 import threading
+import logging
 from datetime import datetime
 from plyer import notification
 from .database import get_reminder_collection
 from bson import ObjectId # Added this import
 
+logger = logging.getLogger(__name__)
+
+# Only the fields needed to notify (or clean up) a due reminder
+DUE_REMINDER_PROJECTION = {"_id": 1, "message": 1, "due_date": 1}
+DUE_DATE_INDEX = [("due_date", 1)]
+
+def ensure_reminder_indexes():
+    """Creates the due_date index used by check_reminders (no-op if it already exists)."""
+    try:
+        get_reminder_collection().create_index(DUE_DATE_INDEX)
+    except Exception as e:
+        logger.error("Error creating reminder due_date index: %s", e)
+
 def check_reminders():
     """Checks for due reminders and sends notifications."""
-    print("Checking for reminders...")
+    logger.debug("Checking for reminders...")
     reminder_collection = get_reminder_collection()
     now = datetime.utcnow()
     
-    reminders = list(reminder_collection.find({"due_date": {"$lte": now}}))
+    # Materialized before the loop, which deletes malformed reminders from the same collection; the
+    # projection keeps the list small. No hint: the planner picks the due_date index when it exists
+    # and still answers if its creation failed.
+    reminders = list(reminder_collection.find(
+        {"due_date": {"$lte": now}},
+        DUE_REMINDER_PROJECTION
+    ))
     
     for reminder in reminders:
         reminder_id = reminder.get('_id') # Get the raw _id
         
         # If _id is None or not a valid ObjectId, log and delete it
         if not reminder_id or not isinstance(reminder_id, ObjectId):
-            print(f"Deleting malformed reminder with missing or invalid ID: {reminder.get('message', 'Unknown')}")
+            logger.warning("Deleting malformed reminder with missing or invalid ID: %s", reminder.get('message', 'Unknown'))
             try:
                 # Attempt to delete by any available identifier or the whole document if _id is truly missing
                 if reminder_id: # If it's not None but invalid ObjectId
                     reminder_collection.delete_one({"_id": reminder_id})
                 else: # If _id is None, try to delete by message and due_date if unique enough
                     reminder_collection.delete_one({"message": reminder.get('message'), "due_date": reminder.get('due_date')})
-                print(f"Malformed reminder deleted from database.")
+                logger.debug("Malformed reminder deleted from database.")
             except Exception as e:
-                print(f"Error deleting malformed reminder: {e}")
+                logger.error("Error deleting malformed reminder: %s", e)
             continue # Skip notification for this malformed reminder
 
-        # Ensure reminder_id is a string for notification message
-        str_reminder_id = str(reminder_id)
-
         notification.notify(
             title="DMS Reminder",
             message=f"Reminder for document: {reminder['message']}",
@@ -41,7 +58,7 @@ def check_reminders():
         )
         # Optionally, delete the reminder after notification
         # reminder_collection.delete_one({"_id": reminder_id}) # Use the valid ObjectId here
-        print(f"Sent notification for reminder: {str_reminder_id}")
+        logger.debug("Sent notification for reminder: %s", reminder_id)
 
 def run_scheduler():
     """Runs the scheduler in a separate thread."""
@@ -53,10 +70,11 @@ def run_scheduler():
 
 def start_scheduler():
     """Starts the scheduler in a background thread."""
+    ensure_reminder_indexes()
     scheduler_thread = threading.Thread(target=run_scheduler)
     scheduler_thread.daemon = True
     scheduler_thread.start()
-    print("Scheduler started.")
+    logger.info("Scheduler started.")
 
 # You would call start_scheduler() in your main application startup logic,
 # for example, in the `backend/app.py` file using FastAPI's startup events.
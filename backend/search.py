@@ -2,8 +2,13 @@ import os
 import faiss
 import numpy as np
 import logging
+import threading
+import time
+import atexit
 from .database import get_document_collection, get_document_chunk_collection # Added get_document_chunk_collection
 from .llm import get_embedding
+from .embedding_cache import get_cached_embeddings
+from .ttl_cache import TTLCache
 from .models import DocumentChunk # Added DocumentChunk model
 from bson import ObjectId
 from pymongo.errors import OperationFailure
@@ -22,35 +27,257 @@ ENABLE_RERANKING = os.getenv('ENABLE_RERANKING', 'False').lower() == 'true'
 RERANK_KEYWORD_WEIGHT = float(os.getenv('RERANK_KEYWORD_WEIGHT', '0.3')) # Weight for keyword matches in re-ranking
 RERANK_SEMANTIC_WEIGHT = float(os.getenv('RERANK_SEMANTIC_WEIGHT', '0.7')) # Weight for semantic matches in re-ranking
 
-FAISS_INDEX_PATH = "data/dms.index"
-DIMENSION = 4096  # Ollama embedding dimension
+# Short-lived cache of search results for repeated queries (dashboard refreshes, chat follow-ups)
+SEARCH_CACHE_TTL_SEC = float(os.getenv('SEARCH_CACHE_TTL_SEC', '30'))
+SEARCH_CACHE_MAX_ITEMS = int(os.getenv('SEARCH_CACHE_MAX_ITEMS', '2048'))
+search_cache = TTLCache(max_items=SEARCH_CACHE_MAX_ITEMS, ttl_sec=SEARCH_CACHE_TTL_SEC)
+SEARCH_SNIPPET_CONTEXT_CHARS = int(os.getenv('SEARCH_SNIPPET_CONTEXT_CHARS', '200')) # Characters of text kept on each side of a match in search snippets
 
 FAISS_INDEX_PATH = "data/dms.index"
 DIMENSION = 4096  # Ollama embedding dimension
+FAISS_MMAP_INDEX = os.getenv('FAISS_MMAP_INDEX', 'True').lower() == 'true' # Memory-map the index file read-only at startup
+INDEX_BUILD_BATCH_SIZE = int(os.getenv('INDEX_BUILD_BATCH_SIZE', '1024')) # Chunks/documents embedded and indexed per rebuild step
+INDEX_TRAINING_BATCH_SIZE = int(os.getenv('INDEX_TRAINING_BATCH_SIZE', '4096')) # Size of the first rebuild step, which trains quantized indexes
+MONGO_CURSOR_BATCH_SIZE = 32 # Documents fetched per round trip while streaming a rebuild
+FAISS_SAVE_DELAY_SEC = float(os.getenv('FAISS_SAVE_DELAY_SEC', '5')) # Index changes within this window are written to disk once
+
+# HNSW graph parameters (neighbors per node, build-time and query-time search breadth)
+HNSW_M = int(os.getenv('HNSW_M', '32'))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '40'))
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '16'))
+
+# Index type: 'hnsw_sq' (default; HNSW over 8-bit scalar-quantized vectors, 4x less memory per vector),
+# 'hnsw' (full float32 vectors) or 'ivfpq' (IVF + product quantization: ~16x less memory, supports removal)
+FAISS_INDEX_TYPE = os.getenv('FAISS_INDEX_TYPE', 'hnsw_sq').lower()
+HNSW_SQ_MIN_TRAINING_VECTORS = int(os.getenv('HNSW_SQ_MIN_TRAINING_VECTORS', '2048')) # Fewer vectors give the quantizer too narrow per-dimension ranges
+IVFPQ_M = int(os.getenv('IVFPQ_M', '64')) # Sub-quantizers per vector (DIMENSION must be divisible by it)
+IVFPQ_NBITS = int(os.getenv('IVFPQ_NBITS', '8')) # Bits per sub-quantizer code
+
+# GPU search (requires faiss-gpu). Index types without a GPU implementation (HNSW) stay on the CPU.
+USE_GPU_FAISS = os.getenv('USE_GPU_FAISS', 'False').lower() == 'true'
+FAISS_GPU_DEVICE = int(os.getenv('FAISS_GPU_DEVICE', '0'))
+
+def create_faiss_index(num_training_vectors: int = 0):
+    """
+    Creates an empty FAISS index wrapped in IndexIDMap2, so vectors are added with explicit IDs
+    and can be removed when the underlying index supports it.
+    Vectors are unit-normalized before insertion, so inner product is cosine similarity.
+
+    HNSW is approximate, O(log N) search and needs no training.
+    HNSW_SQ (default) and IVFPQ must be trained, so they are only created when build_faiss_index
+    has enough vectors to train on (num_training_vectors); otherwise HNSW is used until the next rebuild.
+    """
+    if FAISS_INDEX_TYPE == 'hnsw_sq':
+        if num_training_vectors >= HNSW_SQ_MIN_TRAINING_VECTORS:
+            hnsw_sq = faiss.IndexHNSWSQ(DIMENSION, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            hnsw_sq.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            hnsw_sq.hnsw.efSearch = HNSW_EF_SEARCH
+            return faiss.IndexIDMap2(hnsw_sq)
+        if num_training_vectors:
+            logger.info(f"Not enough vectors ({num_training_vectors}) to train HNSW_SQ. Using HNSW until the next rebuild.")
+
+    if FAISS_INDEX_TYPE == 'ivfpq':
+        nlist = max(2 * int(np.sqrt(num_training_vectors)), 20)
+        if num_training_vectors >= max(nlist, 2 ** IVFPQ_NBITS):
+            quantizer = faiss.IndexFlatIP(DIMENSION)
+            ivfpq = faiss.IndexIVFPQ(quantizer, DIMENSION, nlist, IVFPQ_M, IVFPQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+            ivfpq.nprobe = min(nlist // 4, 10)
+            return faiss.IndexIDMap2(ivfpq)
+        if num_training_vectors:
+            logger.info(f"Not enough vectors ({num_training_vectors}) to train IVFPQ. Using HNSW until the next rebuild.")
+
+    hnsw = faiss.IndexHNSWFlat(DIMENSION, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+    return faiss.IndexIDMap2(hnsw)
+
+def to_faiss_vectors(embeddings: List[List[float]]) -> np.ndarray:
+    """
+    Converts embeddings to a contiguous float32 matrix, L2-normalized in place for cosine search.
+    Rows are copied into a preallocated buffer, so no intermediate array of Python floats is built.
+    """
+    vectors = np.empty((len(embeddings), DIMENSION), dtype=np.float32)
+    for i, embedding in enumerate(embeddings):
+        vectors[i] = embedding
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def load_faiss_index(path: str):
+    """
+    Loads a FAISS index memory-mapped and read-only, so startup doesn't depend on index size and
+    worker processes share the page cache. The first mutation copies the index into memory
+    (ensure_writable_index). Falls back to a regular read if the index type does not support mmap.
+    Set FAISS_MMAP_INDEX=false to always read into memory, e.g. for write-heavy ingestion sessions.
+    """
+    if not FAISS_MMAP_INDEX:
+        return faiss.read_index(path)
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except Exception as e:
+        logger.warning(f"Could not memory-map FAISS index at {path}: {e}. Loading it into memory instead.")
+        return faiss.read_index(path)
+
+# GPU resources are kept at module scope so they outlive every GPU index created from them
+gpu_resources = None
+if USE_GPU_FAISS:
+    try:
+        gpu_resources = faiss.StandardGpuResources()
+        logger.info(f"FAISS GPU resources initialized on device {FAISS_GPU_DEVICE}.")
+    except AttributeError:
+        logger.warning("USE_GPU_FAISS is set but this FAISS build has no GPU support. Using CPU index.")
+
+def move_index_to_gpu(cpu_index):
+    """Returns a GPU copy of cpu_index when GPU FAISS is enabled, otherwise cpu_index itself."""
+    if gpu_resources is None:
+        return cpu_index
+    try:
+        return faiss.index_cpu_to_gpu(gpu_resources, FAISS_GPU_DEVICE, cpu_index)
+    except RuntimeError as e:
+        logger.warning(f"Could not move FAISS index to GPU: {e}. Using CPU index.")
+        return cpu_index
+
+# Index object that was loaded memory-mapped (read-only); copied to memory before the first write
+mmapped_index = None
 
 # Initialize FAISS index
 try:
     if os.path.exists(FAISS_INDEX_PATH):
-        index = faiss.read_index(FAISS_INDEX_PATH)
-        logger.info(f"FAISS index loaded from {FAISS_INDEX_PATH}. NTotal: {index.ntotal}")
+        index = load_faiss_index(FAISS_INDEX_PATH)
+        mmapped_index = index
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT or not isinstance(index, faiss.IndexIDMap2):
+            # Index saved before the switch to cosine similarity / explicit IDs; it is rebuilt on startup
+            logger.warning(f"FAISS index at {FAISS_INDEX_PATH} is in an outdated format. Reinitializing empty index.")
+            index = create_faiss_index()
+        else:
+            inner_index = faiss.downcast_index(index.index)
+            if isinstance(inner_index, faiss.IndexHNSW):
+                inner_index.hnsw.efSearch = HNSW_EF_SEARCH # Not tied to the stored graph; apply the configured value
+            logger.info(f"FAISS index loaded from {FAISS_INDEX_PATH}. NTotal: {index.ntotal}")
     else:
-        index = faiss.IndexFlatL2(DIMENSION)
+        index = create_faiss_index()
         logger.info(f"FAISS index initialized with dimension {DIMENSION}. Index file not found. Building a new one.")
 except Exception as e:
     logger.error(f"Error initializing FAISS: {e}. Reinitializing empty index.")
-    index = faiss.IndexFlatL2(DIMENSION)
+    index = create_faiss_index()
+index = move_index_to_gpu(index)
 
 # Global map to store document_id to FAISS internal ID mapping (for deletion/lookup)
 doc_id_map = {} 
 
-def save_faiss_index():
-    """Saves the current FAISS index to disk."""
+# Next FAISS ID to assign. IDs are sequential and never reused, so removals leave gaps.
+next_faiss_id = int(faiss.vector_to_array(index.id_map).max()) + 1 if index.ntotal else 0
+
+# Inverse of doc_id_map, indexed by FAISS ID (None for removed or unmapped IDs), for O(1) lookups in search
+id_rev: List[Any] = [None] * next_faiss_id
+
+def map_faiss_id(key: str, faiss_id: int):
+    """Records the mapping between a document/chunk ID and its FAISS ID in both directions."""
+    doc_id_map[key] = faiss_id
+    id_rev[faiss_id] = key
+
+def ids_for_faiss_hits(faiss_hits: np.ndarray) -> List[str]:
+    """Maps a row of FAISS search results to document/chunk IDs in rank order, skipping -1 and removed IDs."""
+    return [id_rev[i] for i in faiss_hits.tolist() if 0 <= i < len(id_rev) and id_rev[i] is not None]
+
+# Guards FAISS index mutations against the background writer
+index_lock = threading.RLock()
+# Set when the in-memory index has changes that are not on disk yet
+index_dirty = threading.Event()
+
+def similarities_for_faiss_hits(faiss_hits: np.ndarray, distances: np.ndarray) -> Dict[str, float]:
+    """
+    Maps each hit's document/chunk ID to its search score. Vectors are unit-normalized and the
+    index uses inner product, so the score is the cosine similarity.
+    """
+    return {id_rev[i]: score for i, score in zip(faiss_hits.tolist(), distances.tolist()) if 0 <= i < len(id_rev) and id_rev[i] is not None}
+
+def ensure_writable_index():
+    """Replaces a memory-mapped (read-only) index with an in-memory copy before it is modified."""
+    global index
+    if index is mmapped_index:
+        index = faiss.clone_index(index)
+        logger.info("Copied memory-mapped FAISS index into memory for writing.")
+
+def add_vectors_to_index(vectors: np.ndarray) -> np.ndarray:
+    """Adds vectors under the next sequential FAISS IDs and returns the assigned IDs."""
+    global next_faiss_id
+    with index_lock:
+        ensure_writable_index()
+        faiss_ids = np.arange(next_faiss_id, next_faiss_id + len(vectors), dtype='int64')
+        index.add_with_ids(vectors, faiss_ids)
+        next_faiss_id += len(vectors)
+        id_rev.extend([None] * len(vectors)) # Filled in by map_faiss_id
+    return faiss_ids
+
+def remove_ids_from_index(faiss_ids: List[int]) -> bool:
+    """
+    Removes vectors by FAISS ID and saves the index. Returns False if the index type
+    doesn't support removal (HNSW), in which case a rebuild is required.
+    """
+    for faiss_id in faiss_ids:
+        if faiss_id < len(id_rev):
+            id_rev[faiss_id] = None
+    if not faiss_ids:
+        return True
+    try:
+        with index_lock:
+            ensure_writable_index()
+            index.remove_ids(np.array(faiss_ids, dtype='int64'))
+    except RuntimeError as e:
+        logger.debug(f"FAISS index does not support removal: {e}")
+        return False
+    save_faiss_index()
+    return True
+
+def insert_chunks_with_faiss_ids(chunk_dicts: List[Dict[str, Any]], faiss_ids: List[int]):
+    """Bulk-inserts chunk records with their FAISS IDs already set and maps each chunk ID to its FAISS ID."""
+    for chunk_dict, faiss_id in zip(chunk_dicts, faiss_ids):
+        chunk_dict['faiss_id'] = faiss_id
+    result = get_document_chunk_collection().insert_many(chunk_dicts, ordered=False)
+    for chunk_id, faiss_id in zip(result.inserted_ids, faiss_ids):
+        map_faiss_id(str(chunk_id), faiss_id)
+
+def write_faiss_index():
+    """
+    Writes the current FAISS index to disk. Writes to a temporary file and renames it over
+    the old one, so a memory-mapped reader never sees a partially written index.
+    """
+    tmp_path = f"{FAISS_INDEX_PATH}.tmp"
     try:
-        faiss.write_index(index, FAISS_INDEX_PATH)
+        with index_lock:
+            # GPU indexes can't be serialized directly; index_gpu_to_cpu also copies CPU-resident indexes
+            cpu_index = faiss.index_gpu_to_cpu(index) if gpu_resources is not None else index
+            faiss.write_index(cpu_index, tmp_path)
+            os.replace(tmp_path, FAISS_INDEX_PATH)
         logger.info(f"FAISS index saved to {FAISS_INDEX_PATH}.")
     except Exception as e:
         logger.error(f"Error saving FAISS index: {e}")
 
+def faiss_writer_loop():
+    """Background thread: waits for index changes and writes them out, coalescing bursts of adds."""
+    while True:
+        index_dirty.wait()
+        time.sleep(FAISS_SAVE_DELAY_SEC)
+        index_dirty.clear()
+        write_faiss_index()
+
+def flush_faiss_index():
+    """Synchronously writes pending index changes. Registered to run at interpreter exit."""
+    if index_dirty.is_set():
+        index_dirty.clear()
+        write_faiss_index()
+
+def save_faiss_index():
+    """
+    Marks the FAISS index as changed. The background writer saves it to disk after
+    FAISS_SAVE_DELAY_SEC, so back-to-back uploads cause a single write.
+    """
+    search_cache.clear() # Cached results may reference added or removed documents
+    index_dirty.set()
+
+threading.Thread(target=faiss_writer_loop, name="faiss-writer", daemon=True).start()
+atexit.register(flush_faiss_index)
+
 def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
     """
     Splits text into overlapping chunks.
@@ -58,131 +285,189 @@ def chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
     if not text:
         return []
     
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        if end >= len(text):
-            break
-        start += chunk_size - chunk_overlap
-    return chunks
+    # The last chunk starts before len(text) - chunk_overlap, i.e. the first chunk that reaches the end of the text
+    step = chunk_size - chunk_overlap
+    return [text[start:start + chunk_size] for start in range(0, max(1, len(text) - chunk_overlap), step)]
+
+def embed_chunks(chunks: List[tuple]):
+    """
+    Embeds (content, document_id, user_id, chunk_index) tuples. Returns the FAISS vectors and the
+    matching DocumentChunk dicts, skipping chunks whose embedding could not be generated.
+    """
+    chunk_embeddings_list = []
+    chunk_dicts = []
+
+    embeddings = get_cached_embeddings([chunk[0] for chunk in chunks])
+    for (chunk_content, document_id, user_id, i), embedding in zip(chunks, embeddings):
+        if embedding:
+            new_chunk = DocumentChunk(
+                document_id=ObjectId(document_id),
+                user_id=user_id,
+                chunk_index=i,
+                content=chunk_content,
+                embedding=embedding
+            )
+            chunk_dict = new_chunk.model_dump(by_alias=True, exclude_none=False)
+            if '_id' in chunk_dict and chunk_dict['_id'] is None:
+                chunk_dict.pop('_id')
+            
+            chunk_embeddings_list.append(embedding)
+            chunk_dicts.append(chunk_dict)
+
+    if not chunk_embeddings_list:
+        return None, []
+    return to_faiss_vectors(chunk_embeddings_list), chunk_dicts
+
+def rebuild_batch_size() -> int:
+    """Items to embed in the next rebuild step: the first step is larger, so quantized indexes train on a broad sample."""
+    return INDEX_TRAINING_BATCH_SIZE if index.ntotal == 0 else INDEX_BUILD_BATCH_SIZE
+
+def add_build_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    Adds one batch of vectors during a rebuild. The first batch creates the index, training it
+    on that batch if the index type needs training.
+    """
+    global index
+    if index.ntotal == 0:
+        index = move_index_to_gpu(create_faiss_index(len(vectors)))
+        if not index.is_trained:
+            index.train(vectors)
+    return add_vectors_to_index(vectors)
+
+def index_chunk_batch(chunks: List[tuple]):
+    """Embeds and indexes one batch of chunks during a rebuild, then bulk-inserts the chunk records."""
+    vectors, chunk_dicts = embed_chunks(chunks)
+    if chunk_dicts:
+        faiss_ids = add_build_vectors(vectors)
+        insert_chunks_with_faiss_ids(chunk_dicts, faiss_ids.tolist()) # Maps chunk ID to FAISS internal ID
+
+def index_document_batch(documents: List[tuple]):
+    """Embeds and indexes one batch of (doc_id, text) tuples during a whole-document rebuild."""
+    documents_collection = get_document_collection()
+    embeddings_list = []
+    doc_ids = []
+    
+    for (doc_id, _), embedding in zip(documents, get_cached_embeddings([text for _, text in documents])):
+        if embedding:
+            embeddings_list.append(embedding)
+            doc_ids.append(doc_id)
+    
+    if not embeddings_list:
+        return
+
+    faiss_ids = add_build_vectors(to_faiss_vectors(embeddings_list))
+    for doc_id, faiss_id in zip(doc_ids, faiss_ids.tolist()):
+        map_faiss_id(doc_id, faiss_id)  # Map document ID to FAISS internal ID
+        documents_collection.update_one(
+            {"_id": ObjectId(doc_id)},
+            {"$set": {"faiss_id": faiss_id}}
+        )
 
 def build_faiss_index():
-    """Builds the FAISS index from all documents or document chunks in the database."""
-    global index, doc_id_map
+    """
+    Builds the FAISS index from all documents or document chunks in the database.
+    Documents are streamed from a cursor and embedded/indexed INDEX_BUILD_BATCH_SIZE items
+    at a time (INDEX_TRAINING_BATCH_SIZE for the first, training batch), so memory use doesn't
+    grow with the size of the corpus.
+    """
+    global index, doc_id_map, next_faiss_id, id_rev
     
     documents_collection = get_document_collection()
     document_chunks_collection = get_document_chunk_collection() # Get chunk collection
 
-    # 1. Clear current in-memory index
-    index = faiss.IndexFlatL2(DIMENSION)
+    # 1. Clear current in-memory index (replaced by a trained one once the first batch is embedded)
+    index = create_faiss_index()
+    next_faiss_id = 0
     doc_id_map = {} # This map will now store chunk_id -> faiss_id
+    id_rev = []
+    document_count = 0
 
     if ENABLE_CHUNKING:
         # Rebuild from chunks
         document_chunks_collection.delete_many({}) # Clear existing chunks
         
-        documents = list(documents_collection.find({}, {"_id": 1, "user_id": 1, "extracted_text": 1}))
-        logger.info(f"Found {len(documents)} documents for chunking and indexing.")
-
-        if not documents:
-            save_faiss_index()
-            logger.info("No documents to chunk and index.")
-            return
-
-        chunk_embeddings_list = []
-        chunk_ids = []
+        cursor = documents_collection.find({}, {"_id": 1, "user_id": 1, "extracted_text": 1}).batch_size(MONGO_CURSOR_BATCH_SIZE)
+        chunk_buffer = [] # (content, doc_id, user_id, chunk_index) tuples waiting to be embedded
 
-        for doc in documents:
-            doc_id = str(doc["_id"])
-            user_id = doc["user_id"]
+        for doc in cursor:
+            document_count += 1
             text = doc.get("extracted_text", "")
-            
             if text.strip():
                 chunks = chunk_text(text, CHUNK_SIZE, CHUNK_OVERLAP)
-                for i, chunk_content in enumerate(chunks):
-                    embedding = get_embedding(chunk_content)
-                    if embedding:
-                        new_chunk = DocumentChunk(
-                            document_id=ObjectId(doc_id),
-                            user_id=user_id,
-                            chunk_index=i,
-                            content=chunk_content,
-                            embedding=embedding
-                        )
-                        chunk_dict = new_chunk.model_dump(by_alias=True, exclude_none=False)
-                        if '_id' in chunk_dict and chunk_dict['_id'] is None:
-                            chunk_dict.pop('_id')
-                        
-                        result = document_chunks_collection.insert_one(chunk_dict)
-                        chunk_id = str(result.inserted_id)
-                        
-                        chunk_embeddings_list.append(embedding)
-                        chunk_ids.append(chunk_id)
-        
-        if not chunk_embeddings_list:
-            save_faiss_index()
-            logger.info("No valid chunks found for indexing.")
-            return
-            
-        vectors = np.array(chunk_embeddings_list).astype('float32')
-        index.add(vectors)
+                chunk_buffer.extend((chunk, doc["_id"], doc["user_id"], i) for i, chunk in enumerate(chunks))
+            if len(chunk_buffer) >= rebuild_batch_size():
+                index_chunk_batch(chunk_buffer)
+                chunk_buffer = []
+        if chunk_buffer:
+            index_chunk_batch(chunk_buffer)
         
-        for i, chunk_id in enumerate(chunk_ids):
-            doc_id_map[chunk_id] = i # Map chunk ID to FAISS internal ID
-            document_chunks_collection.update_one(
-                {"_id": ObjectId(chunk_id)},
-                {"$set": {"faiss_id": i}}
-            )
-        logger.info(f"FAISS index rebuilt successfully with {index.ntotal} chunks.")
+        if index.ntotal == 0:
+            logger.info(f"No valid chunks found for indexing in {document_count} documents.")
+        else:
+            logger.info(f"FAISS index rebuilt successfully with {index.ntotal} chunks from {document_count} documents.")
 
     else: # Existing whole-document indexing logic
-        documents = list(documents_collection.find({}, {"_id": 1, "extracted_text": 1}))
-        logger.info(f"Found {len(documents)} documents in the database for indexing (whole document).")
-        
-        if not documents:
-            save_faiss_index()
-            logger.info("No documents to index.")
-            return
+        cursor = documents_collection.find({}, {"_id": 1, "extracted_text": 1}).batch_size(MONGO_CURSOR_BATCH_SIZE)
+        document_buffer = [] # (doc_id, text) tuples waiting to be embedded
 
-        embeddings_list = []
-        doc_ids = []
-        
-        for doc in documents:
+        for doc in cursor:
+            document_count += 1
             text = doc.get("extracted_text", "")
             if text.strip():
-                embedding = get_embedding(text)
-                if embedding:
-                    embeddings_list.append(embedding)
-                    doc_ids.append(str(doc["_id"]))
-        
-        if not embeddings_list:
-            save_faiss_index()
-            logger.info("No valid text found for indexing.")
-            return
-            
-        vectors = np.array(embeddings_list).astype('float32')
-        index.add(vectors)
+                document_buffer.append((str(doc["_id"]), text))
+            if len(document_buffer) >= rebuild_batch_size():
+                index_document_batch(document_buffer)
+                document_buffer = []
+        if document_buffer:
+            index_document_batch(document_buffer)
         
-        for i, doc_id in enumerate(doc_ids):
-            doc_id_map[doc_id] = i  # Map document ID to FAISS internal ID
-            documents_collection.update_one(
-                {"_id": ObjectId(doc_id)},
-                {"$set": {"faiss_id": i}}
-            )
-        logger.info(f"FAISS index rebuilt successfully with {index.ntotal} documents.")
+        if index.ntotal == 0:
+            logger.info(f"No valid text found for indexing in {document_count} documents.")
+        else:
+            logger.info(f"FAISS index rebuilt successfully with {index.ntotal} documents.")
 
     save_faiss_index()
 
+def load_faiss_id_map() -> bool:
+    """
+    Restores doc_id_map and id_rev for an index loaded from disk, from the faiss_id stored on each chunk
+    (or document) record. Returns False, leaving the maps empty, if the records don't account for exactly
+    the vectors in the index (e.g. documents deleted from an HNSW index), in which case it must be rebuilt.
+    """
+    if index.ntotal == 0:
+        return False
+
+    collection = get_document_chunk_collection() if ENABLE_CHUNKING else get_document_collection()
+    records = collection.find({"faiss_id": {"$ne": None}}, {"_id": 1, "faiss_id": 1}).batch_size(MONGO_CURSOR_BATCH_SIZE)
+    for record in records:
+        faiss_id = record["faiss_id"]
+        if not 0 <= faiss_id < len(id_rev) or id_rev[faiss_id] is not None:
+            break
+        map_faiss_id(str(record["_id"]), faiss_id)
+    else:
+        if len(doc_id_map) == index.ntotal:
+            return True
+
+    doc_id_map.clear()
+    id_rev[:] = [None] * len(id_rev)
+    return False
+
+def load_or_build_faiss_index():
+    """
+    Startup: keeps the index loaded from disk (memory-mapped, see load_faiss_index) when MongoDB's
+    records match it, and only re-embeds everything with build_faiss_index otherwise.
+    """
+    if load_faiss_id_map():
+        logger.info(f"Using FAISS index from {FAISS_INDEX_PATH} with {index.ntotal} vectors; no rebuild needed.")
+    else:
+        build_faiss_index()
+
 
 def add_to_faiss_index(document_id: str, user_id: str, text: str):
     """Adds a single document's text embedding (or its chunks) to the FAISS index."""
     global index, doc_id_map
     
     documents_collection = get_document_collection()
-    document_chunks_collection = get_document_chunk_collection()
 
     if ENABLE_CHUNKING:
         chunks = chunk_text(text, CHUNK_SIZE, CHUNK_OVERLAP)
@@ -190,66 +475,33 @@ def add_to_faiss_index(document_id: str, user_id: str, text: str):
             logger.warning(f"No chunks generated for document {document_id}. Skipping FAISS indexing.")
             return
 
-        chunk_embeddings_list = []
-        chunk_ids = []
-
-        for i, chunk_content in enumerate(chunks):
-            embedding = get_embedding(chunk_content)
-            if embedding:
-                new_chunk = DocumentChunk(
-                    document_id=ObjectId(document_id),
-                    user_id=user_id,
-                    chunk_index=i,
-                    content=chunk_content,
-                    embedding=embedding
-                )
-                chunk_dict = new_chunk.model_dump(by_alias=True, exclude_none=False)
-                if '_id' in chunk_dict and chunk_dict['_id'] is None:
-                    chunk_dict.pop('_id')
-                
-                result = document_chunks_collection.insert_one(chunk_dict)
-                chunk_id = str(result.inserted_id)
-                
-                chunk_embeddings_list.append(embedding)
-                chunk_ids.append(chunk_id)
-        
-        if not chunk_embeddings_list:
+        vectors, chunk_dicts = embed_chunks([(chunk, document_id, user_id, i) for i, chunk in enumerate(chunks)])
+        if not chunk_dicts:
             logger.warning(f"Could not generate embeddings for any chunks of document {document_id}. Skipping FAISS indexing.")
             return
-
-        vectors = np.array(chunk_embeddings_list).astype('float32')
         
         if index.ntotal == 0 and index.d != DIMENSION:
-            index = faiss.IndexFlatL2(DIMENSION)
+            index = create_faiss_index()
         
         # Add all chunk vectors
-        start_faiss_id = index.ntotal
-        index.add(vectors)
-
-        for i, chunk_id in enumerate(chunk_ids):
-            faiss_id = start_faiss_id + i
-            doc_id_map[chunk_id] = faiss_id
-            document_chunks_collection.update_one(
-                {"_id": ObjectId(chunk_id)},
-                {"$set": {"faiss_id": faiss_id}}
-            )
+        faiss_ids = add_vectors_to_index(vectors)
+        insert_chunks_with_faiss_ids(chunk_dicts, faiss_ids.tolist())
         save_faiss_index()
-        logger.info(f"Document {document_id} chunks added to FAISS index. Total chunks: {len(chunk_ids)}.")
+        logger.info(f"Document {document_id} chunks added to FAISS index. Total chunks: {len(chunk_dicts)}.")
 
     else: # Existing whole-document indexing logic
-        embedding = get_embedding(text)
+        embedding = get_cached_embeddings([text])[0]
         if not embedding:
             logger.warning(f"Could not generate embedding for document {document_id}. Skipping FAISS indexing.")
             return
 
-        vector = np.array([embedding]).astype('float32')
+        vector = to_faiss_vectors([embedding])
         
         if index.ntotal == 0 and index.d != DIMENSION:
-            index = faiss.IndexFlatL2(DIMENSION)
+            index = create_faiss_index()
         
-        new_faiss_id = index.ntotal
-        index.add(vector)
-        doc_id_map[document_id] = new_faiss_id
+        new_faiss_id = int(add_vectors_to_index(vector)[0])
+        map_faiss_id(document_id, new_faiss_id)
 
         documents_collection.update_one(
             {"_id": ObjectId(document_id)},
@@ -262,42 +514,56 @@ def add_to_faiss_index(document_id: str, user_id: str, text: str):
 def delete_from_faiss_index(document_id: str):
     """
     Deletes a document (or its associated chunks) from the FAISS index.
-    For IndexFlatL2, this primarily means removing from doc_id_map and requiring a rebuild.
+    IVFPQ indexes remove the vectors directly; HNSW does not support removal, so there this
+    primarily means removing from doc_id_map and requiring a rebuild.
     """
     global doc_id_map
     document_chunks_collection = get_document_chunk_collection()
+    search_cache.clear()
 
     if ENABLE_CHUNKING:
         # Find all chunks associated with this document_id
-        chunks_to_delete = list(document_chunks_collection.find({"document_id": ObjectId(document_id)}))
+        chunks_to_delete = list(document_chunks_collection.find({"document_id": ObjectId(document_id)}, {"_id": 1, "faiss_id": 1}))
         if chunks_to_delete:
+            faiss_ids = []
             for chunk in chunks_to_delete:
-                chunk_id = str(chunk["_id"])
-                if chunk_id in doc_id_map:
-                    del doc_id_map[chunk_id]
+                faiss_id = doc_id_map.pop(str(chunk["_id"]), chunk.get("faiss_id"))
+                if faiss_id is not None:
+                    faiss_ids.append(faiss_id)
             document_chunks_collection.delete_many({"document_id": ObjectId(document_id)})
-            logger.warning(f"Document {document_id} and its chunks marked for removal. Index rebuild required for full deletion.")
+            if remove_ids_from_index(faiss_ids):
+                logger.info(f"Document {document_id} and its chunks removed from FAISS index.")
+            else:
+                logger.warning(f"Document {document_id} and its chunks marked for removal. Index rebuild required for full deletion.")
         else:
             logger.info(f"No chunks found for document {document_id} to delete from FAISS.")
     else:
         if document_id in doc_id_map:
-            del doc_id_map[document_id]
-            logger.warning(f"Document {document_id} marked for removal. Index rebuild required for full deletion.")
+            faiss_id = doc_id_map.pop(document_id)
+            if remove_ids_from_index([faiss_id]):
+                logger.info(f"Document {document_id} removed from FAISS index.")
+            else:
+                logger.warning(f"Document {document_id} marked for removal. Index rebuild required for full deletion.")
 
 def clear_faiss_index():
     """Clears the FAISS index and associated chunk data."""
-    global index, doc_id_map
+    global index, doc_id_map, next_faiss_id, id_rev
     
     document_chunks_collection = get_document_chunk_collection()
     document_chunks_collection.delete_many({}) # Clear all chunks from DB
 
-    index = faiss.IndexFlatL2(DIMENSION)
+    index = move_index_to_gpu(create_faiss_index())
+    next_faiss_id = 0
     doc_id_map = {}
+    id_rev = []
     save_faiss_index()
     logger.info("FAISS index cleared.")
 
 # --- UTILITY FUNCTION FOR MONGO SANITIZATION ---
 
+# Maps each regex metacharacter to its backslash-escaped form
+MONGO_REGEX_ESCAPE_TABLE = str.maketrans({c: '\\' + c for c in r'\$*+?()[]{}.|'})
+
 def sanitize_mongodb_query(query: str) -> str:
     """
     Escapes special characters in a string to prevent regex injection errors in MongoDB's
@@ -307,15 +573,44 @@ def sanitize_mongodb_query(query: str) -> str:
     "unmatched closing parenthesis" errors in MongoDB regex.
     """
     # Characters that need escaping in MongoDB/Regex: \ $ * + ? ( ) [ ] { } . |
-    # The backslash must be escaped first.
-    return re.sub(r'([\\$*+?()\[\]{}.|])', r'\\\1', query)
+    # translate() escapes every character in a single pass, so the backslash can't be double-escaped.
+    return query.translate(MONGO_REGEX_ESCAPE_TABLE)
 
 # --- END UTILITY FUNCTION ---
 
+# Fields searched by keyword_search
+KEYWORD_SEARCH_FIELDS = ("filename", "tags", "summary", "extracted_text")
+
+def build_keyword_query(pattern: str) -> Dict[str, Any]:
+    """
+    Builds the $or keyword filter: the (already sanitized) pattern is sent once as a plain
+    case-insensitive $regex string per field, instead of a client-side compiled regex object.
+    """
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in KEYWORD_SEARCH_FIELDS]}
+
+# Compound text index backing keyword_search (a collection can have only one text index)
+KEYWORD_TEXT_INDEX = [(field, "text") for field in KEYWORD_SEARCH_FIELDS]
+
+def ensure_keyword_text_index():
+    """Creates the text index used by keyword_search if it doesn't exist yet."""
+    try:
+        get_document_collection().create_index(KEYWORD_TEXT_INDEX, name="keyword_search_text")
+    except Exception as e:
+        logger.error(f"Could not create keyword search text index: {e}")
+
+def copy_search_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shallow-copies each result, so callers annotating them (scores, serialization) don't modify cached entries."""
+    return [dict(doc) for doc in results]
+
 
 def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs semantic search against the FAISS index."""
+    """Performs semantic search against the FAISS index. Results are cached briefly per (query, limit)."""
     
+    cache_key = ("semantic", query, limit)
+    cached_results = search_cache.get(cache_key)
+    if cached_results is not None:
+        return copy_search_results(cached_results)
+
     if index.ntotal == 0:
         logger.warning("FAISS index is empty. Cannot perform semantic search.")
         return []
@@ -325,7 +620,7 @@ def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         logger.error("Could not generate query embedding for semantic search.")
         return []
 
-    query_vector = np.array([query_vector]).astype('float32')
+    query_vector = to_faiss_vectors([query_vector])
     
     # Perform search
     D, I = index.search(query_vector, min(limit, index.ntotal))
@@ -334,91 +629,95 @@ def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     document_chunks_collection = get_document_chunk_collection()
     
     result_docs = []
+    similarities = similarities_for_faiss_hits(I[0], D[0])
     
     if ENABLE_CHUNKING:
         # Retrieve chunks, then their parent documents
-        matched_faiss_ids = I[0]
-        matched_chunk_ids = [chunk_id for chunk_id, faiss_id in doc_id_map.items() if faiss_id in matched_faiss_ids]
+        matched_chunk_ids = ids_for_faiss_hits(I[0])
 
         if matched_chunk_ids:
             object_chunk_ids = [ObjectId(chunk_id) for chunk_id in matched_chunk_ids if ObjectId.is_valid(chunk_id)]
             
             # Fetch chunks from DB
-            chunks = list(document_chunks_collection.find({"_id": {"$in": object_chunk_ids}}))
+            chunks = list(document_chunks_collection.find({"_id": {"$in": object_chunk_ids}}, {"document_id": 1, "content": 1}))
             
-            # Get unique document IDs from these chunks
-            unique_doc_ids = list(set(str(chunk["document_id"]) for chunk in chunks))
+            # Fetch all parent documents in one query
+            unique_doc_ids = list({chunk["document_id"] for chunk in chunks})
+            parent_documents = documents_collection.find({"_id": {"$in": unique_doc_ids}}) if unique_doc_ids else []
             
-            if unique_doc_ids:
-                # Fetch parent documents
-                object_doc_ids = [ObjectId(doc_id) for doc_id in unique_doc_ids if ObjectId.is_valid(doc_id)]
-                parent_documents = list(documents_collection.find({"_id": {"$in": object_doc_ids}}))
-                
-                # Map document ID to document object for easy lookup
-                doc_map = {str(doc["_id"]): doc for doc in parent_documents}
-                
-                # Reconstruct results, prioritizing chunks and their parent documents
-                for faiss_index_val in I[0]:
-                    # Find the chunk_id corresponding to the FAISS index
-                    chunk_id = next((cid for cid, fid in doc_id_map.items() if fid == faiss_index_val), None)
-                    if chunk_id:
-                        # Find the chunk object
-                        chunk_obj = next((c for c in chunks if str(c["_id"]) == chunk_id), None)
-                        if chunk_obj:
-                            parent_doc_id = str(chunk_obj["document_id"])
-                            if parent_doc_id in doc_map and doc_map[parent_doc_id] not in result_docs:
-                                # Add the parent document, and potentially the chunk content
-                                doc_to_add = doc_map[parent_doc_id].copy()
-                                # Optionally, add the specific chunk content to the document for context
-                                doc_to_add['relevant_chunk_content'] = chunk_obj['content']
-                                result_docs.append(doc_to_add)
-                                if len(result_docs) >= limit: # Respect the limit
-                                    break
+            # Map document and chunk IDs to their objects for easy lookup
+            doc_map = {str(doc["_id"]): doc for doc in parent_documents}
+            chunk_map = {str(chunk["_id"]): chunk for chunk in chunks}
+            
+            # Reconstruct results in FAISS rank order, one entry per parent document (its best-matching chunk)
+            seen_doc_ids = set()
+            for chunk_id in matched_chunk_ids:
+                chunk_obj = chunk_map.get(chunk_id)
+                if chunk_obj:
+                    parent_doc_id = str(chunk_obj["document_id"])
+                    if parent_doc_id in doc_map and parent_doc_id not in seen_doc_ids:
+                        seen_doc_ids.add(parent_doc_id)
+                        # Add the parent document along with the specific chunk content for context
+                        doc_to_add = doc_map[parent_doc_id].copy()
+                        doc_to_add['relevant_chunk_content'] = chunk_obj['content']
+                        doc_to_add['semantic_score'] = similarities[chunk_id]
+                        result_docs.append(doc_to_add)
+                        if len(result_docs) >= limit: # Respect the limit
+                            break
     else:
         # Existing whole-document retrieval logic
-        matched_faiss_ids = I[0]
-        matched_doc_ids = [doc_id for doc_id, faiss_id in doc_id_map.items() if faiss_id in matched_faiss_ids]
+        matched_doc_ids = ids_for_faiss_hits(I[0])
 
         if matched_doc_ids:
             object_ids = [ObjectId(doc_id) for doc_id in matched_doc_ids if ObjectId.is_valid(doc_id)]
             
-            for faiss_index_val in I[0]:
-                doc_id = next((doc_id for doc_id, map_id in doc_id_map.items() if map_id == faiss_index_val), None)
-                if doc_id:
-                    doc = documents_collection.find_one({"_id": ObjectId(doc_id)})
-                    if doc:
-                        result_docs.append(doc)
-                        if len(result_docs) >= limit: # Respect the limit
-                            break
+            # Fetch all matched documents in one query, then restore the FAISS rank order
+            doc_map = {str(doc["_id"]): doc for doc in documents_collection.find({"_id": {"$in": object_ids}})}
+            result_docs = [doc_map[doc_id] for doc_id in matched_doc_ids if doc_id in doc_map][:limit]
+            for doc in result_docs:
+                doc['semantic_score'] = similarities[str(doc["_id"])]
+
+    search_cache.set(cache_key, result_docs)
+    return copy_search_results(result_docs)
 
-    return result_docs
+def is_quoted_phrase(query: str) -> bool:
+    """True for a query wrapped in double quotes, which $text treats as an exact phrase."""
+    query = query.strip()
+    return len(query) > 1 and query.startswith('"') and query.endswith('"')
 
 def keyword_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs keyword search using MongoDB's $regex (or $text if implemented)."""
+    """
+    Performs keyword search using the MongoDB $text index, ranked by text score.
+    Falls back to a $regex scan if the text index is unavailable or finds nothing,
+    since $text only matches whole (stemmed) words and not substrings.
+    """
     documents_collection = get_document_collection()
+
+    try:
+        docs = list(
+            documents_collection.find({"$text": {"$search": query}}, {"text_score": {"$meta": "textScore"}})
+            .sort([("text_score", {"$meta": "textScore"})])
+            .limit(limit)
+        )
+        if docs:
+            return docs
+    except OperationFailure as e:
+        logger.warning(f"Text search unavailable, falling back to regex keyword search: {e}")
+    
+    # A quoted phrase is matched as the phrase itself; the quotes are not part of the stored text
+    regex_query = query.strip()[1:-1] if is_quoted_phrase(query) else query
     
     # --- CRITICAL FIX: Sanitize query before using it in $regex ---
-    sanitized_query = sanitize_mongodb_query(query)
+    sanitized_query = sanitize_mongodb_query(regex_query)
     # --- END CRITICAL FIX ---
     
     # Use $regex for case-insensitive keyword search across fields
     # MongoDB search usually requires the text to be in a field and uses $text or $regex
-    # Assuming documents are indexed on filename, tags, summary, and extracted_text
     # We use a simple $or query with $regex for flexibility, ensuring the regex is safe.
     
-    regex_pattern = re.compile(sanitized_query, re.IGNORECASE)
-    
     try:
         # Use $or to search across multiple fields
-        docs = list(documents_collection.find({
-            "$or": [
-                {"filename": {"$regex": regex_pattern}},
-                {"tags": {"$regex": regex_pattern}},
-                {"summary": {"$regex": regex_pattern}},
-                # Search extracted_text, but keep it performant
-                {"extracted_text": {"$regex": regex_pattern}},
-            ]
-        }).limit(limit))
+        docs = list(documents_collection.find(build_keyword_query(sanitized_query)).limit(limit))
         
         return docs
     except OperationFailure as e:
@@ -429,9 +728,27 @@ def keyword_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         logger.error(f"General Error during keyword search: {e}")
         raise e
 
+# Queries that look like a bare filename (e.g. "invoice_2023.pdf")
+LITERAL_FILENAME_RE = re.compile(r'^[\w.\-]+\.\w{2,5}$')
+
+def is_literal_query(query: str) -> bool:
+    """True for quoted phrases and filenames, which keyword search answers without embedding the query."""
+    return is_quoted_phrase(query) or bool(LITERAL_FILENAME_RE.match(query.strip()))
+
 def hybrid_search(query: str, semantic_limit: int = 3, keyword_limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs a combined search using semantic and keyword results."""
+    """
+    Performs a combined search using semantic and keyword results. Results are cached briefly.
+    Literal queries (quoted phrases, filenames) skip the semantic search entirely.
+    """
+    if is_literal_query(query):
+        logger.debug(f"Literal query '{query}', using keyword search only.")
+        return keyword_search(query.strip(), limit=keyword_limit + semantic_limit)
     
+    cache_key = ("hybrid", query, semantic_limit, keyword_limit, ENABLE_RERANKING)
+    cached_results = search_cache.get(cache_key)
+    if cached_results is not None:
+        return copy_search_results(cached_results)
+
     semantic_results = semantic_search(query, limit=semantic_limit)
     keyword_results = keyword_search(query, limit=keyword_limit)
     
@@ -454,9 +771,27 @@ def hybrid_search(query: str, semantic_limit: int = 3, keyword_limit: int = 5) -
     combined_list = list(combined_results.values())
 
     if ENABLE_RERANKING:
-        return re_rank_documents(query, combined_list)
-    else:
-        return combined_list
+        combined_list = re_rank_documents(query, combined_list)
+
+    search_cache.set(cache_key, combined_list)
+    return copy_search_results(combined_list)
+
+def make_search_snippet(text: str, query: str, context_chars: int = SEARCH_SNIPPET_CONTEXT_CHARS) -> str:
+    """
+    Returns the part of text around the first case-insensitive match of the query (or, failing that,
+    of any query word), with context_chars on each side. Falls back to the start of the text.
+    """
+    if not text:
+        return ""
+    match = re.search(re.escape(query), text, re.IGNORECASE) if query.strip() else None
+    if match is None:
+        words = [re.escape(word) for word in query.split()]
+        match = re.search("|".join(words), text, re.IGNORECASE) if words else None
+    match_start, match_end = (match.start(), match.end()) if match else (0, 0)
+
+    start = max(match_start - context_chars, 0)
+    end = min(match_end + context_chars, len(text))
+    return f"{'...' if start > 0 else ''}{text[start:end].strip()}{'...' if end < len(text) else ''}"
 
 def re_rank_documents(query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -466,18 +801,19 @@ def re_rank_documents(query: str, documents: List[Dict[str, Any]]) -> List[Dict[
     if not documents:
         return []
 
-    # Simple keyword matching for re-ranking score
-    query_lower = query.lower()
+    # Simple keyword matching for re-ranking score. A case-insensitive pattern avoids
+    # allocating a lowercased copy of each (potentially large) text field.
+    query_pattern = re.compile(re.escape(query), re.IGNORECASE)
     
     scored_documents = []
     for doc in documents:
         score = 0.0
         # Keyword presence in filename, summary, extracted_text
-        if query_lower in doc.get('filename', '').lower():
+        if query_pattern.search(doc.get('filename', '')):
             score += 0.2 * RERANK_KEYWORD_WEIGHT
-        if query_lower in doc.get('summary', '').lower():
+        if query_pattern.search(doc.get('summary', '')):
             score += 0.3 * RERANK_KEYWORD_WEIGHT
-        if query_lower in doc.get('extracted_text', '').lower():
+        if query_pattern.search(doc.get('extracted_text', '')):
             score += 0.5 * RERANK_KEYWORD_WEIGHT
         
         # Semantic score (if available, otherwise assume base relevance)
@@ -489,7 +825,7 @@ def re_rank_documents(query: str, documents: List[Dict[str, Any]]) -> List[Dict[
 
         # If chunking is enabled, prioritize documents where the query matches the relevant chunk content
         if ENABLE_CHUNKING and 'relevant_chunk_content' in doc:
-            if query_lower in doc['relevant_chunk_content'].lower():
+            if query_pattern.search(doc['relevant_chunk_content']):
                 score += 0.5 # Additional boost if query is in the specific chunk
 
         doc['rerank_score'] = score
@@ -499,206 +835,3 @@ def re_rank_documents(query: str, documents: List[Dict[str, Any]]) -> List[Dict[
     sorted_documents = sorted(scored_documents, key=lambda x: x.get('rerank_score', 0.0), reverse=True)
     logger.info(f"Re-ranked {len(sorted_documents)} documents.")
     return sorted_documents
-
-    # Prepare document data
-    embeddings_list = []
-    doc_ids = []
-    
-    for doc in documents:
-        # Check if embedding exists in the document itself or if you need to regenerate
-        text = doc.get("extracted_text", "")
-        if text.strip():
-            embedding = get_embedding(text)
-            if embedding:
-                embeddings_list.append(embedding)
-                doc_ids.append(str(doc["_id"]))
-    
-    if not embeddings_list:
-        save_faiss_index()
-        logger.info("No valid text found for indexing.")
-        return
-        
-    # 2. Add vectors to FAISS
-    vectors = np.array(embeddings_list).astype('float32')
-    index.add(vectors)
-    
-    # 3. Update the mapping and save the index
-    for i, doc_id in enumerate(doc_ids):
-        doc_id_map[doc_id] = i  # Map document ID to FAISS internal ID
-        # Optional: update MongoDB document with FAISS ID
-        documents_collection.update_one(
-            {"_id": ObjectId(doc_id)},
-            {"$set": {"faiss_id": i}}
-        )
-
-    save_faiss_index()
-    logger.info(f"FAISS index rebuilt successfully with {index.ntotal} vectors.")
-
-
-def add_to_faiss_index(document_id: str, text: str):
-    """Adds a single document's text embedding to the FAISS index."""
-    global index, doc_id_map
-    
-    embedding = get_embedding(text)
-    if not embedding:
-        logger.warning(f"Could not generate embedding for document {document_id}. Skipping FAISS indexing.")
-        return
-
-    vector = np.array([embedding]).astype('float32')
-    
-    # Check if the FAISS index is empty and if its dimension is correct
-    if index.ntotal == 0 and index.d != DIMENSION:
-        # Re-initialize if dimension mismatch (rare, but safety check)
-        index = faiss.IndexFlatL2(DIMENSION)
-    
-    # Add the new vector
-    new_faiss_id = index.ntotal
-    index.add(vector)
-    doc_id_map[document_id] = new_faiss_id
-
-    # Update MongoDB document with FAISS ID
-    documents_collection = get_document_collection()
-    documents_collection.update_one(
-        {"_id": ObjectId(document_id)},
-        {"$set": {"faiss_id": new_faiss_id}}
-    )
-    
-    save_faiss_index()
-    logger.info(f"Document {document_id} added to FAISS index with FAISS ID {new_faiss_id}.")
-
-def delete_from_faiss_index(document_id: str):
-    """Deletes a document from the FAISS index (Note: FAISS IndexFlatL2 doesn't support direct deletion)."""
-    # For IndexFlatL2, deletion requires rebuilding, which is too slow.
-    # The current standard workaround is to rebuild the index entirely from the DB.
-    # If using IndexIDMap, soft deletion is possible.
-    # For now, we perform a placeholder action and rebuild periodically.
-    
-    if document_id in doc_id_map:
-        del doc_id_map[document_id]
-        logger.warning(f"Document {document_id} marked for removal. Index rebuild required for full deletion.")
-        # If the document is deleted, schedule a rebuild for cleanup if not done periodically.
-
-def clear_faiss_index():
-    """Clears the FAISS index."""
-    global index, doc_id_map
-    
-    index = faiss.IndexFlatL2(DIMENSION)
-    doc_id_map = {}
-    save_faiss_index()
-    logger.info("FAISS index cleared.")
-
-# --- UTILITY FUNCTION FOR MONGO SANITIZATION ---
-
-def sanitize_mongodb_query(query: str) -> str:
-    """
-    Escapes special characters in a string to prevent regex injection errors in MongoDB's
-    keyword search pipeline, which often uses $regex or $text with regex features.
-    
-    Specifically targets characters like $, (, ), [, ], *, +, etc., which cause
-    "unmatched closing parenthesis" errors in MongoDB regex.
-    """
-    # Characters that need escaping in MongoDB/Regex: \ $ * + ? ( ) [ ] { } . |
-    # The backslash must be escaped first.
-    return re.sub(r'([\\$*+?()\[\]{}.|])', r'\\\1', query)
-
-# --- END UTILITY FUNCTION ---
-
-
-def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs semantic search against the FAISS index."""
-    
-    if index.ntotal == 0:
-        logger.warning("FAISS index is empty. Cannot perform semantic search.")
-        return []
-
-    query_vector = get_embedding(query)
-    if not query_vector:
-        logger.error("Could not generate query embedding for semantic search.")
-        return []
-
-    query_vector = np.array([query_vector]).astype('float32')
-    
-    # Perform search
-    D, I = index.search(query_vector, min(limit, index.ntotal))
-    
-    # Map results back to MongoDB documents
-    documents_collection = get_document_collection()
-    result_docs = []
-    
-    # Get the list of document IDs that matched FAISS internal IDs
-    matched_faiss_ids = I[0]
-    matched_doc_ids = [doc_id for doc_id, faiss_id in doc_id_map.items() if faiss_id in matched_faiss_ids]
-
-    if matched_doc_ids:
-        # Fetch MongoDB documents corresponding to the matched IDs
-        object_ids = [ObjectId(doc_id) for doc_id in matched_doc_ids if ObjectId.is_valid(doc_id)]
-        
-        # Preserve original FAISS ranking by finding documents one by one based on index order
-        for faiss_index in I[0]:
-            doc_id = next((doc_id for doc_id, map_id in doc_id_map.items() if map_id == faiss_index), None)
-            if doc_id:
-                doc = documents_collection.find_one({"_id": ObjectId(doc_id)})
-                if doc:
-                    result_docs.append(doc)
-
-    return result_docs
-
-def keyword_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs keyword search using MongoDB's $regex (or $text if implemented)."""
-    documents_collection = get_document_collection()
-    
-    # --- CRITICAL FIX: Sanitize query before using it in $regex ---
-    sanitized_query = sanitize_mongodb_query(query)
-    # --- END CRITICAL FIX ---
-    
-    # Use $regex for case-insensitive keyword search across fields
-    # MongoDB search usually requires the text to be in a field and uses $text or $regex
-    # Assuming documents are indexed on filename, tags, summary, and extracted_text
-    # We use a simple $or query with $regex for flexibility, ensuring the regex is safe.
-    
-    regex_pattern = re.compile(sanitized_query, re.IGNORECASE)
-    
-    try:
-        # Use $or to search across multiple fields
-        docs = list(documents_collection.find({
-            "$or": [
-                {"filename": {"$regex": regex_pattern}},
-                {"tags": {"$regex": regex_pattern}},
-                {"summary": {"$regex": regex_pattern}},
-                # Search extracted_text, but keep it performant
-                {"extracted_text": {"$regex": regex_pattern}},
-            ]
-        }).limit(limit))
-        
-        return docs
-    except OperationFailure as e:
-        logger.error(f"MongoDB Operation Failure during keyword search: {e}")
-        # Re-raise as a standard HTTP error to be caught by FastAPI app.py
-        raise Exception(f"MongoDB search error: {e.errmsg}") from e
-    except Exception as e:
-        logger.error(f"General Error during keyword search: {e}")
-        raise e
-
-def hybrid_search(query: str, semantic_limit: int = 3, keyword_limit: int = 5) -> List[Dict[str, Any]]:
-    """Performs a combined search using semantic and keyword results."""
-    
-    semantic_results = semantic_search(query, limit=semantic_limit)
-    keyword_results = keyword_search(query, limit=keyword_limit)
-    
-    # Combine and deduplicate results
-    combined_results = {}
-    
-    # Add semantic results first (higher priority for relevance)
-    for doc in semantic_results:
-        doc_id = str(doc["_id"])
-        if doc_id not in combined_results:
-            combined_results[doc_id] = doc
-            
-    # Add keyword results (lower priority)
-    for doc in keyword_results:
-        doc_id = str(doc["_id"])
-        if doc_id not in combined_results:
-            combined_results[doc_id] = doc
-            
-    # Return as a list of document objects
-    return list(combined_results.values())
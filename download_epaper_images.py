@@ -1,100 +1,307 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import logging
 import time
-import shutil
+import functools
+import threading
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
-def download_epaper_images(base_url, start_page, end_page, output_dir):
+try:
+    import lxml # noqa: F401  (only checked for availability; much faster than html.parser)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+log = logging.getLogger(__name__)
+
+DOWNLOAD_WORKERS = 12 # Parallel image downloads (plain HTTP, so they don't need the browser)
+PAGE_FETCH_WORKERS = 8 # Parallel page HTML fetches; kept lower than downloads to stay polite to the site
+IMAGE_SELECTOR = "img.img-fluid, img.page-image" # The page's main e-paper image
+IMAGE_WAIT_TIMEOUT = 20 # Seconds to wait for the image to appear in the browser
+IMAGE_POLL_INTERVAL = 0.1 # Seconds between checks while waiting; short so a page is picked up soon after its image appears
+BROWSER_TABS = 6 # Pages loading at once in the browser fallback, one tab each
+# Returns the image's absolute src once it is in the DOM, in a single browser round trip
+IMAGE_SRC_SCRIPT = f"const img = document.querySelector('{IMAGE_SELECTOR}'); return img ? img.src || null : null;"
+COPY_BUFFER_SIZE = 1 << 20 # 1 MiB reads; a 64 KiB buffer needs many more read/write calls per page image
+MAX_REQUESTS_PER_SECOND = 5 # Politeness cap on HTTP requests to the e-paper site, shared by all threads
+DEBUG = bool(os.environ.get("DMS_DEBUG")) # Save a screenshot of each page the browser fails on
+# Sent by both the browser and the HTTP session; the site returns 403 for the default requests User-Agent
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+class _RateLimiter:
+    """Spaces out calls to wait() so at most `rate` of them proceed per second, across threads."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_allowed = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_allowed - now
+            self.next_allowed = max(now, self.next_allowed) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+_rate_limiter = _RateLimiter(MAX_REQUESTS_PER_SECOND)
+_copy_buffers = threading.local() # One reusable copy buffer per download thread
+
+def _make_session():
     """
-    Downloads e-paper images from a given base URL and page range using a headless Chrome browser.
+    Creates a requests.Session whose pooled keep-alive connections are reused across pages,
+    retrying transient gateway errors.
+    This stays on HTTP/1.1: with requests capped at MAX_REQUESTS_PER_SECOND, a handful of warm
+    keep-alive connections already carries the load, so HTTP/2 multiplexing (httpx + h2) would add
+    a dependency without shortening the run.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
-    print(f"Starting image download from {base_url} (pages {start_page} to {end_page}) using headless browser...")
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def _page_url_base(base_url):
+    """Prefix of an edition's page URLs: the edition URL with its last segment replaced by 'page/'."""
+    return f"{base_url.rsplit('/', 1)[0]}/page/"
+
+def _resolve_image_url_from_html(session, page_url_base, page_num):
+    """
+    Fetches an e-paper page over plain HTTP and returns its image URL from the served HTML,
+    or None if the image isn't there (e.g. the page is rendered by JavaScript).
+    """
+    page_url = f"{page_url_base}{page_num}"
+    try:
+        _rate_limiter.wait()
+        response = session.get(page_url, timeout=30)
+        response.raise_for_status()
+    except Exception as e:
+        log.warning("Could not read page %d over HTTP: %s", page_num, e)
+        return None
+    img = BeautifulSoup(response.content, HTML_PARSER).select_one(IMAGE_SELECTOR)
+    image_url = img.get('src') if img else None
+    if not image_url:
+        return None
+    image_url = urljoin(page_url, image_url) # Resolves relative, root-relative and protocol-relative srcs
+    log.info("page %d -> %s", page_num, image_url)
+    return image_url
+
+@functools.lru_cache(maxsize=1)
+def _chromedriver_path():
+    """
+    Path to chromedriver: CHROMEDRIVER_PATH if set, otherwise the webdriver_manager download
+    (which does a network check, so it's resolved once per process).
+    """
+    return os.environ.get("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
 
+def _start_browser():
+    """Starts the headless Chrome browser used for pages whose image is rendered by JavaScript."""
     # Set up Chrome options for headless browsing
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument(f"user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    # Don't load images in the browser; only the <img> src is needed, the image itself is downloaded separately
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # Navigation returns at DOMContentLoaded instead of waiting for ads and analytics; the image
+    # element is polled for separately anyway
+    chrome_options.page_load_strategy = 'eager'
 
-    # Initialize WebDriver
-    driver = None
+    service = Service(_chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(30) # Set page load timeout to 30 seconds
+    log.info("Headless browser started.")
+    return driver
+
+def _save_error_screenshot(driver, path):
+    """
+    Captures the current tab as PNG and writes it to path on a background thread. The capture stays
+    on the calling thread because the driver is not thread-safe.
+    """
     try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.set_page_load_timeout(30) # Set page load timeout to 30 seconds
+        png = driver.get_screenshot_as_png()
+    except Exception as e:
+        log.warning("Could not take screenshot: %s", e)
+        return
 
-        for page_num in range(start_page, end_page + 1):
-            page_url = f"{base_url.rsplit('/', 1)[0]}/page/{page_num}"
-            
-            try:
-                print(f"  Navigating to {page_url}...")
-                driver.get(page_url)
-                
-                # Wait for the main image to be present on the page
-                # This XPath might need adjustment based on the actual structure of the e-paper site
-                # Looking for an img tag with class 'img-fluid' or similar that is visible
-                img_element = WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.XPATH, "//img[contains(@class, 'img-fluid') or contains(@class, 'page-image')]"))
-                )
-                
-                image_url = img_element.get_attribute('src')
+    def write():
+        with open(path, 'wb') as f:
+            f.write(png)
+        log.info("Screenshot saved to %s", path)
 
-                if not image_url:
-                    print(f"  Could not find image URL for page {page_num} at {page_url}. Skipping.")
-                    continue
-
-                if not image_url.startswith('http'):
-                    # If it's a relative URL, construct the absolute URL
-                    base_domain = "/".join(base_url.split('/')[:3])
-                    image_url = f"{base_domain}{image_url}"
-
-                print(f"  Found image URL for page {page_num}: {image_url}")
-
-                # Download the image using requests, as selenium's direct download can be complex
-                # Use the same headers as the browser to avoid 403 errors
-                img_response = requests.get(image_url, stream=True, headers={'User-Agent': chrome_options.arguments[-1].split('=')[1]})
-                img_response.raise_for_status()
-                
-                image_filename = f"page_{page_num}.jpg"
-                image_path = os.path.join(output_dir, image_filename)
-                
-                with open(image_path, 'wb') as out_file:
-                    shutil.copyfileobj(img_response.raw, out_file)
-                print(f"  Downloaded {image_filename}")
-                
-                time.sleep(2) # Be polite to the server and allow time for next page load
+    threading.Thread(target=write).start()
 
+def _resolve_image_urls_in_tabs(driver, page_url_base, page_nums, output_dir, on_resolved):
+    """
+    Resolves image URLs for page_nums with up to BROWSER_TABS pages loading at once, each in its
+    own tab of the one driver. Tabs are polled round-robin and closed once their page resolves or
+    times out, and the next page is opened in its place. on_resolved(page_num, image_url) is
+    called for every image found.
+    """
+    pending = list(page_nums)
+    open_tabs = {} # window handle -> (page_num, page_url, deadline)
+    home_handle = driver.current_window_handle # Kept open so the session survives closing every page tab
+
+    while pending or open_tabs:
+        # Fill the free tab slots; window.open returns immediately, unlike driver.get
+        while pending and len(open_tabs) < BROWSER_TABS:
+            page_num = pending.pop(0)
+            page_url = f"{page_url_base}{page_num}"
+            log.debug("Opening %s in a browser tab", page_url)
+            handles_before = set(driver.window_handles)
+            driver.execute_script("window.open(arguments[0], '_blank');", page_url)
+            handle = (set(driver.window_handles) - handles_before).pop()
+            open_tabs[handle] = (page_num, page_url, time.monotonic() + IMAGE_WAIT_TIMEOUT)
+
+        # One script call per tab both finds the image element and reads its src
+        for handle, (page_num, page_url, deadline) in list(open_tabs.items()):
+            driver.switch_to.window(handle)
+            try:
+                image_url = driver.execute_script(IMAGE_SRC_SCRIPT)
+                if not image_url and time.monotonic() >= deadline:
+                    raise TimeoutError(f"No image found on {page_url} after {IMAGE_WAIT_TIMEOUT}s")
             except Exception as e:
-                print(f"  Error processing page {page_num} from {page_url}: {e}")
-                # Attempt to take a screenshot on error for debugging
-                error_screenshot_path = os.path.join(output_dir, f"error_page_{page_num}.png")
-                driver.save_screenshot(error_screenshot_path)
-                print(f"  Screenshot saved to {error_screenshot_path}")
-                continue
+                log.warning("Error processing page %d: %s", page_num, e)
+                if DEBUG:
+                    _save_error_screenshot(driver, os.path.join(output_dir, f"error_page_{page_num}.png"))
+                image_url = None
+            else:
+                if not image_url:
+                    continue # Still loading
+                image_url = urljoin(page_url, image_url)
+                log.info("page %d -> %s", page_num, image_url)
+                on_resolved(page_num, image_url)
+            driver.close()
+            del open_tabs[handle]
 
+        driver.switch_to.window(home_handle)
+        if open_tabs:
+            time.sleep(IMAGE_POLL_INTERVAL)
+
+def _copy_buffer():
+    """Returns this thread's COPY_BUFFER_SIZE memoryview, allocating it on first use."""
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _copy_buffers.buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+    return buffer
+
+def _download(session, image_url, image_path):
+    """
+    Downloads one image to image_path. Returns True on success.
+    The image is written to a .part file and renamed when complete, so an existing image_path
+    is always a finished download.
+    """
+    part_path = f"{image_path}.part"
+    try:
+        _rate_limiter.wait()
+        img_response = session.get(image_url, stream=True, timeout=30)
+        img_response.raise_for_status()
+        img_response.raw.decode_content = True # Undo any Content-Encoding while streaming the raw body
+
+        # The copy stays in user space: the site is HTTPS, so the socket carries TLS records rather
+        # than image bytes, and Linux sendfile() can't read from a socket anyway.
+        # Reading into the thread's preallocated buffer avoids a new bytes object per chunk.
+        buffer = _copy_buffer()
+        with open(part_path, 'wb') as out_file:
+            while True:
+                n = img_response.raw.readinto(buffer)
+                if not n:
+                    break
+                out_file.write(buffer[:n])
+        os.replace(part_path, image_path)
+        return True
     except Exception as e:
-        print(f"  An error occurred during WebDriver initialization or main loop: {e}")
+        log.warning("Error downloading %s: %s", image_url, e)
+        return False
+
+def _is_downloaded(image_path):
+    return os.path.exists(image_path) and os.path.getsize(image_path) > 0
+
+def download_epaper_images(base_url, start_page, end_page, output_dir):
+    """
+    Downloads e-paper images from a given base URL and page range.
+    Image URLs are read from the pages' HTML over plain HTTP, several pages at a time. A headless
+    Chrome browser is only started for pages whose image is rendered by JavaScript; it resolves
+    them in several tabs of a single driver (the driver is not thread-safe, but pages in different
+    tabs load concurrently). Each image download starts in the background as soon as its URL is
+    known, overlapping with the remaining page resolution.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    log.info("Starting image download from %s (pages %d to %d)", base_url, start_page, end_page)
+    started = time.perf_counter()
+
+    page_url_base = _page_url_base(base_url)
+    # Shared pooled HTTP session for pages and images
+    session = _make_session()
+    download_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    download_futures = []
+
+    def start_download(page_num, image_url):
+        image_path = os.path.join(output_dir, f"page_{page_num}.jpg")
+        download_futures.append(download_pool.submit(_download, session, image_url, image_path))
+
+    try:
+        # 1. Resolve image URLs from the HTML concurrently; map yields in page order as results arrive
+        # Pages downloaded by an earlier run are skipped, so reruns only retry the failures
+        page_nums = []
+        for page_num in range(start_page, end_page + 1):
+            if _is_downloaded(os.path.join(output_dir, f"page_{page_num}.jpg")):
+                log.debug("Page %d already downloaded. Skipping.", page_num)
+            else:
+                page_nums.append(page_num)
+        already_downloaded = (end_page - start_page + 1) - len(page_nums)
+        browser_pages = [] # Pages whose HTML had no image
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as page_pool:
+            html_image_urls = page_pool.map(lambda page_num: _resolve_image_url_from_html(session, page_url_base, page_num), page_nums)
+            for page_num, image_url in zip(page_nums, html_image_urls):
+                if image_url:
+                    start_download(page_num, image_url)
+                else:
+                    browser_pages.append(page_num)
+
+        # 2. Fall back to the browser for the rest, downloading each image while the other tabs load
+        driver = None
+        try:
+            if browser_pages:
+                driver = _start_browser()
+                _resolve_image_urls_in_tabs(driver, page_url_base, browser_pages, output_dir, start_download)
+        except Exception as e:
+            log.warning("An error occurred while resolving page images in the browser: %s", e)
+        finally:
+            if driver:
+                driver.quit()
+                log.info("Headless browser closed.")
+
+        # 3. Wait for the remaining downloads
+        downloaded = sum(future.result() for future in as_completed(download_futures))
     finally:
-        if driver:
-            driver.quit()
-            print("Headless browser closed.")
+        download_pool.shutdown(wait=True)
+        session.close()
 
-    print("Image download complete.")
+    log.info("Downloaded %d/%d pages in %.1fs (%d already downloaded by earlier runs)",
+             downloaded, end_page - start_page + 1, time.perf_counter() - started, already_downloaded)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     base_epaper_url = "https://epaper.vijayavani.net/edition/Bengaluru/VVAANINEW_BEN/VVAANINEW_BEN_20250917"
     start_page_num = 2
     end_page_num = 20
     output_directory = "kannada_training_data/images"
-    
+
     download_epaper_images(base_epaper_url, start_page_num, end_page_num, output_directory)
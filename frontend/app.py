@@ -1,85 +1,61 @@
 import streamlit as st
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 import os 
 import json 
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Configuration ---
-BACKEND_URL = "http://127.0.0.1:8000" # Default for local development
+try:
+    import orjson # Optional; decodes the large document and search-result lists several times faster
+except ImportError:
+    orjson = None
 
-# Attempt to get backend URL from environment variable for Render deployment
-if "BACKEND_URL" in os.environ:
-    BACKEND_URL = os.environ["BACKEND_URL"]
-# No need for st.secrets check if primarily using environment variables or local default
+# --- Configuration ---
+# Set BACKEND_URL in the environment for Render deployment; defaults to the local development server
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 
-# --- Session State Initialization ---
-if 'logged_in' not in st.session_state:
-    st.session_state['logged_in'] = False
-if 'token' not in st.session_state:
-    st.session_state['token'] = None
-if 'username' not in st.session_state:
-    st.session_state['username'] = None
+BACKEND_CONNECT_TIMEOUT_SEC = 3 # Seconds to wait for a connection to the backend before reporting it unreachable
 
-# --- Helper Functions ---
-def get_auth_headers():
-    """Returns authorization headers if a token is present in session state."""
-    if st.session_state['token']:
-        return {"Authorization": f"Bearer {st.session_state['token']}"}
-    return {}
+# Backend endpoints; per-item URLs append the id, e.g. f"{REMINDERS_URL}{reminder_id}"
+TOKEN_URL = f"{BACKEND_URL}/token"
+REGISTER_URL = f"{BACKEND_URL}/register/"
+DOCUMENTS_URL = f"{BACKEND_URL}/documents/"
+UPLOAD_URL = f"{BACKEND_URL}/upload/"
+SEARCH_URL = f"{BACKEND_URL}/search/"
+QA_STREAM_URL = f"{BACKEND_URL}/qa/stream"
+REMINDERS_URL = f"{BACKEND_URL}/reminders/"
+UPLOADED_FILES_URL = f"{BACKEND_URL}/files/uploaded"
+FAISS_CLEAR_URL = f"{BACKEND_URL}/faiss/clear"
+FAISS_REBUILD_URL = f"{BACKEND_URL}/faiss/rebuild"
+BACKUP_URL = f"{BACKEND_URL}/backup/documents"
+CONVERSATIONS_URL = f"{BACKEND_URL}/conversations/"
+MESSAGES_URL = f"{BACKEND_URL}/messages/"
+ADMIN_FEEDBACK_URL = f"{BACKEND_URL}/admin/feedback/"
 
-def get_documents():
-    """
-    Fetches all documents from the backend and ensures their _id is a valid string.
-    Filters out documents with invalid or missing _id.
-    """
-    try:
-        response = requests.get(f"{BACKEND_URL}/documents/", headers=get_auth_headers())
-        response.raise_for_status()
-        documents = response.json()
-        
-        processed_and_valid_documents = []
-        for doc in documents:
-            if isinstance(doc, dict):
-                doc_id = doc.get('_id')
-                
-                # Handle {"$oid": "..."} format
-                if isinstance(doc_id, dict) and '$oid' in doc_id:
-                    doc['_id'] = doc_id['$oid']
-                # Handle already string format
-                elif isinstance(doc_id, str):
-                    doc['_id'] = doc_id
-                # Fallback to 'id' if '_id' is not present or invalid, and then check if it's a valid string
-                elif doc.get('id') is not None and isinstance(doc.get('id'), str):
-                    doc['_id'] = doc['id']
-                else:
-                    # If no valid _id or id, skip this document
-                    st.warning(f"A document named '{doc.get('filename', 'Unknown')}' could not be loaded due to a missing or invalid ID. Please check the backend logs for details.")
-                    continue
-                
-                processed_and_valid_documents.append(doc)
-            else:
-                st.warning(f"A document entry could not be loaded as it was malformed. Please check the backend logs for details.")
-        
-        return processed_and_valid_documents
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to connect to the backend or fetch documents: {e}. Please ensure the backend server is running and accessible.")
-        return []
-
-# --- Streamlit UI ---
-st.set_page_config(
-    page_title="Document Management System", 
-    layout="wide", 
-    initial_sidebar_state="expanded",
-    menu_items={
-        'Get Help': 'https://www.extremely.cool.app/help',
-        'Report a bug': "https://www.extremely.cool.app/bug",
-        'About': "# This is a header. This is an *extremely* cool app!"
-    }
+# Sidebar actions
+ACTIONS = (
+    "Dashboard", 
+    "Upload Document", 
+    "Search Documents", 
+    "Document Q&A", 
+    "Manage Reminders", 
+    "Manage Uploaded Files", 
+    "Backup Data", 
+    "Delete Document", 
+    "FAISS Management",
+    "Chat with AI",
+    "Admin Feedback", # New admin feature
 )
 
-# Custom CSS for a cleaner look
-st.markdown("""
+CHAT_RECENT_MESSAGES = 20 # Chat messages shown as individual chat bubbles; older ones are rendered as one block
+CHAT_PREFETCH_CONVERSATIONS = 3 # Most recent conversations whose messages are fetched ahead of being selected
+FEEDBACK_PAGE_SIZE = 20 # Feedback entries rendered per page on Admin Feedback
+FEEDBACK_TYPES = ("OCR_CORRECTION", "SUMMARY_ADJUSTMENT", "CATEGORY_ADJUSTMENT", "TAG_ADJUSTMENT", "PII_VALIDATION", "QA_CORRECTION", "OTHER")
+FEEDBACK_TYPE_INDEX = {feedback_type: i for i, feedback_type in enumerate(FEEDBACK_TYPES)}
+
+CUSTOM_CSS = """
     <style>
     .main .block-container {
         padding-top: 2rem;
@@ -113,7 +89,313 @@ st.markdown("""
         margin-bottom: 10px;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+# --- Session State Initialization ---
+if 'logged_in' not in st.session_state:
+    st.session_state['logged_in'] = False
+if 'token' not in st.session_state:
+    st.session_state['token'] = None
+if 'username' not in st.session_state:
+    st.session_state['username'] = None
+
+# --- Helper Functions ---
+class ConnectTimeoutAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a default connect timeout, so calls fail fast when the backend is down.
+    There's no default read timeout: uploads (OCR) and Q&A/chat (LLM) can legitimately take minutes.
+    """
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout if timeout is not None else (BACKEND_CONNECT_TIMEOUT_SEC, None), **kwargs)
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session, so backend calls reuse pooled keep-alive connections instead of reconnecting each time."""
+    session = requests.Session()
+    adapter = ConnectTimeoutAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_auth_headers():
+    """Returns authorization headers if a token is present in session state."""
+    if st.session_state['token']:
+        return {"Authorization": f"Bearer {st.session_state['token']}"}
+    return {}
+
+def parse_json(response):
+    """
+    Decodes a JSON response body, with orjson when it's installed. Decode errors are raised as
+    requests' JSONDecodeError either way, so existing RequestException handlers still catch them.
+    """
+    if orjson is None:
+        return response.json()
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+
+def get_error_detail(e):
+    """
+    The backend's "detail" message for a failed request, falling back to the response text or the
+    exception itself (no response, or a body that isn't JSON).
+    """
+    response = getattr(e, 'response', None)
+    if response is None: # Checked with "is": an error Response is falsy
+        return str(e)
+    try:
+        body = parse_json(response)
+    except ValueError:
+        return response.text or str(e)
+    if isinstance(body, dict):
+        return body.get("detail", response.text)
+    return response.text
+
+def reset_chat_cache():
+    """Makes the Chat page refetch its conversations and messages on the next run."""
+    for key in ('chat_conversations', 'chat_messages', 'chat_messages_conversation_id', 'chat_prefetched_messages'):
+        st.session_state.pop(key, None)
+
+def checked_get(session, url, headers):
+    """GETs url and raises for error statuses; safe to run in worker threads."""
+    response = session.get(url, headers=headers)
+    response.raise_for_status()
+    return response
+
+def parallel_get(urls):
+    """
+    GETs all urls concurrently with the current auth headers, so their latencies overlap.
+    Returns {url: future}; future.result() is the response, or raises that request's error.
+    """
+    session = get_session()
+    headers = get_auth_headers() # Read session state here; it isn't available in the worker threads
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        return {url: pool.submit(checked_get, session, url, headers) for url in urls}
+
+@st.cache_resource
+def get_prefetch_pool():
+    """Background threads for speculative fetches whose results may be used on a later rerun."""
+    return ThreadPoolExecutor(max_workers=2)
+
+def _fix_id(doc):
+    """
+    Returns doc with its _id as a string, taken from {"$oid": ...}, a string _id or a string 'id',
+    or None if it has no usable id.
+    """
+    doc_id = doc.get('_id')
+    if type(doc_id) is str:
+        return doc
+    if type(doc_id) is dict and '$oid' in doc_id:
+        doc['_id'] = doc_id['$oid']
+        return doc
+    if type(doc.get('id')) is str:
+        doc['_id'] = doc['id']
+        return doc
+    return None
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_documents(token):
+    """
+    Fetches all documents from the backend and ensures their _id is a valid string.
+    Filters out documents with invalid or missing _id and sorts the rest newest first.
+    Returns (documents, warnings), where warnings describe the skipped entries; they're returned
+    rather than shown so cache hits show them too.
+    Results are cached per token for 30 seconds; call fetch_documents.clear() after changing documents.
+    Request errors are raised (and so not cached).
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().get(DOCUMENTS_URL, headers=headers)
+    response.raise_for_status()
+    documents = parse_json(response)
+
+    valid_entries = [doc for doc in documents if type(doc) is dict]
+    warnings = [f"A document entry could not be loaded as it was malformed. Please check the backend logs for details."] * (len(documents) - len(valid_entries))
+
+    fixed_entries = [_fix_id(doc) for doc in valid_entries]
+    # If no valid _id or id, skip the document
+    warnings += [
+        f"A document named '{doc.get('filename', 'Unknown')}' could not be loaded due to a missing or invalid ID. Please check the backend logs for details."
+        for doc, fixed in zip(valid_entries, fixed_entries) if fixed is None
+    ]
+    documents = [doc for doc in fixed_entries if doc is not None]
+
+    if documents:
+        # Parsed once here, in one vectorized call, so callers can sort and display by date without
+        # re-parsing the strings
+        import pandas as pd # Imported where needed so pages without tables don't pay for it
+        upload_dates = pd.to_datetime([doc.get('upload_date') for doc in documents], format='ISO8601', errors='coerce')
+        for doc, upload_dt in zip(documents, upload_dates):
+            doc['_upload_dt'] = None if pd.isna(upload_dt) else upload_dt
+        # Newest first, so pages can list documents as they come; unparseable dates go last
+        _, order = upload_dates.sort_values(ascending=False, na_position='last', return_indexer=True)
+        documents = [documents[i] for i in order]
+    return documents, warnings
+
+@st.cache_data(show_spinner=False)
+def document_index(doc_ids, _documents):
+    """
+    Returns ({selectbox label: _id}, {_id: position in _documents}) for the sorted documents.
+    Cached on doc_ids alone; st.cache_data doesn't hash arguments whose names start with '_'.
+    """
+    doc_options = {f"{doc['filename']} (Uploaded: {doc['upload_date']})": doc['_id'] for doc in _documents}
+    positions = {doc['_id']: i for i, doc in enumerate(_documents)}
+    return doc_options, positions
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_document(token, document_id):
+    """Fetches one document, including its full extracted text. Cached per token for 30 seconds."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().get(f"{DOCUMENTS_URL}{document_id}", headers=headers)
+    response.raise_for_status()
+    return parse_json(response)
+
+@st.cache_data(ttl=15, show_spinner=False)
+def fetch_reminders(token):
+    """
+    Fetches all reminders from the backend. Cached per token for 15 seconds; call
+    fetch_reminders.clear() after changing reminders.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().get(REMINDERS_URL, headers=headers)
+    response.raise_for_status()
+    return parse_json(response)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def dashboard_frame(doc_ids, _documents):
+    """The Dashboard's ten most recently uploaded documents. Cached on doc_ids, like document_index."""
+    import pandas as pd
+    df = pd.DataFrame(_documents, columns=['filename', 'category', 'summary', '_upload_dt'])
+    df = df.rename(columns={'_upload_dt': 'upload_date'}) # Already parsed by get_documents
+    return df.head(10) # fetch_documents already sorted them newest first
+
+@st.cache_data(show_spinner=False)
+def reminders_frame(reminders):
+    """
+    Builds the reminders editor's DataFrame (indexed by _id, sorted by due date, with an unticked
+    delete column). Returns (frame, number of reminders skipped for a missing _id).
+    Cached on the reminders list, so reruns between changes skip the pandas work.
+    """
+    import pandas as pd
+    df_reminders = pd.DataFrame(reminders)
+    df_reminders['due_date'] = pd.to_datetime(df_reminders['due_date'], format='ISO8601')
+
+    # Ensure _id is not None before proceeding
+    skipped = int(df_reminders['_id'].isna().sum())
+    df_reminders = df_reminders.dropna(subset=['_id'])
+    df_reminders = df_reminders.sort_values(by="due_date").set_index('_id')[['status', 'message', 'due_date']]
+    df_reminders['delete'] = False
+    return df_reminders, skipped
+
+@st.cache_data(ttl=10, show_spinner=False)
+def fetch_uploaded_files(token):
+    """
+    Lists the files in the backend's uploads directory. Cached per token for 10 seconds; call
+    fetch_uploaded_files.clear() after deleting one.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().get(UPLOADED_FILES_URL, headers=headers)
+    response.raise_for_status()
+    return parse_json(response)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_feedback(token):
+    """
+    Fetches all document feedback entries (admin only). Cached per token for 60 seconds; call
+    fetch_feedback.clear() after submitting, editing or deleting one.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = get_session().get(ADMIN_FEEDBACK_URL, headers=headers)
+    response.raise_for_status()
+    return parse_json(response)
+
+def get_documents():
+    """Returns the current user's (cached) documents, or an empty list if the backend can't be reached."""
+    try:
+        documents, warnings = fetch_documents(st.session_state['token'])
+    except requests.exceptions.RequestException as e:
+        st.error(f"Failed to connect to the backend or fetch documents: {e}. Please ensure the backend server is running and accessible.")
+        return []
+    for warning in warnings:
+        st.warning(warning)
+    return documents
+
+@st.fragment
+def render_upcoming_reminders():
+    """
+    The Manage Reminders list. Runs as a fragment, so editing the table or applying changes reruns
+    only this block rather than the whole page.
+    """
+    st.subheader("Upcoming Reminders")
+    try:
+        reminders = fetch_reminders(st.session_state['token'])
+        if reminders:
+            df_reminders, skipped_reminders = reminders_frame(reminders)
+            if skipped_reminders:
+                st.warning(f"A reminder entry could not be loaded due to a missing or invalid ID. Please check the backend logs for details.")
+
+            # One editor for all reminders instead of three buttons per row; changes are sent on "Apply Changes"
+            edited_reminders = st.data_editor(
+                df_reminders,
+                column_config={
+                    "status": st.column_config.SelectboxColumn("Status", options=["pending", "done"], required=True),
+                    "message": st.column_config.TextColumn("Message"),
+                    "due_date": st.column_config.DatetimeColumn("Due Date", format="YYYY-MM-DD HH:mm"),
+                    "delete": st.column_config.CheckboxColumn("Delete"),
+                },
+                disabled=["message", "due_date"],
+                hide_index=True,
+                num_rows="fixed",
+                key="reminders_editor"
+            )
+
+            if st.button("Apply Changes"):
+                ids_to_delete = edited_reminders.index[edited_reminders['delete']]
+                status_changes = edited_reminders.loc[edited_reminders['status'] != df_reminders['status'], 'status'].drop(ids_to_delete, errors='ignore')
+                all_applied = True
+                with st.spinner("Updating reminders..."):
+                    for reminder_id in ids_to_delete:
+                        try:
+                            response = get_session().delete(f"{REMINDERS_URL}{reminder_id}", headers=get_auth_headers())
+                            response.raise_for_status()
+                        except requests.exceptions.RequestException as e:
+                            st.error(f"Failed to delete reminder: {e}. Please try again.")
+                            all_applied = False
+                    for reminder_id, new_status in status_changes.items():
+                        try:
+                            response = get_session().put(f"{REMINDERS_URL}{reminder_id}/status", json={"status": new_status}, headers=get_auth_headers())
+                            response.raise_for_status()
+                        except requests.exceptions.RequestException as e:
+                            st.error(f"Failed to mark reminder as {new_status}: {e}. Please try again.")
+                            all_applied = False
+                fetch_reminders.clear() # Some changes may have gone through even if others failed
+                if all_applied:
+                    st.success("Reminders updated successfully!")
+                    st.rerun(scope="fragment") # Only the list changed; the rest of the page stays as is
+
+        else:
+            st.info("No upcoming reminders.")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Failed to fetch reminders: {e}. Please ensure the backend is running.")
+
+# --- Streamlit UI ---
+st.set_page_config(
+    page_title="Document Management System", 
+    layout="wide", 
+    initial_sidebar_state="expanded",
+    menu_items={
+        'Get Help': 'https://www.extremely.cool.app/help',
+        'Report a bug': "https://www.extremely.cool.app/bug",
+        'About': "# This is a header. This is an *extremely* cool app!"
+    }
+)
+
+# Custom CSS for a cleaner look
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 st.title("📄 Document Management System")
 
@@ -130,19 +412,19 @@ if not st.session_state['logged_in']:
 
             if submitted:
                 try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/token", 
+                    response = get_session().post(
+                        TOKEN_URL, 
                         data={"username": username, "password": password}
                     )
                     response.raise_for_status()
-                    token_data = response.json()
+                    token_data = parse_json(response)
                     st.session_state['token'] = token_data['access_token']
                     st.session_state['username'] = username
                     st.session_state['logged_in'] = True
                     st.sidebar.success("Logged in successfully!")
                     st.rerun()
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     st.sidebar.error(f"Login failed: {error_detail}. Please check your username and password, or register if you don't have an account.")
     elif auth_choice == "Register":
         with st.sidebar.form("register_form"):
@@ -153,15 +435,15 @@ if not st.session_state['logged_in']:
 
             if submitted:
                 try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/register/", 
+                    response = get_session().post(
+                        REGISTER_URL, 
                         data={"username": new_username, "password": new_password, "email": new_email}
                     )
                     response.raise_for_status()
                     st.sidebar.success("Registration successful! You can now log in with your new account.")
                     st.rerun()
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     st.sidebar.error(f"Registration failed: {error_detail}. Please try again with different credentials.")
     st.stop() # Stop execution if not logged in
 else:
@@ -174,22 +456,7 @@ else:
 
 # --- Sidebar ---
 st.sidebar.header("Actions")
-selected_action = st.sidebar.radio(
-    "Choose an action", 
-    [
-        "Dashboard", 
-        "Upload Document", 
-        "Search Documents", 
-        "Document Q&A", 
-        "Manage Reminders", 
-        "Manage Uploaded Files", 
-        "Backup Data", 
-        "Delete Document", 
-        "FAISS Management",
-        "Chat with AI",
-        "Admin Feedback" # New admin feature
-    ]
-)
+selected_action = st.sidebar.radio("Choose an action", ACTIONS)
 
 # --- Main Content ---
 
@@ -200,9 +467,7 @@ if selected_action == "Dashboard":
     st.subheader("Recent Documents")
     documents = get_documents() # Now get_documents returns already processed and valid documents
     if documents:
-        df = pd.DataFrame(documents)
-        df['upload_date'] = pd.to_datetime(df['upload_date'])
-        st.dataframe(df[['filename', 'category', 'summary', 'upload_date']].sort_values(by="upload_date", ascending=False).head(10))
+        st.dataframe(dashboard_frame(tuple(doc['_id'] for doc in documents), documents))
     else:
         st.info("No documents uploaded yet. Start by uploading one!")
 
@@ -212,11 +477,9 @@ elif selected_action == "Delete Document":
     documents = get_documents() # Now get_documents returns already processed and valid documents
     if documents:
         # No need for valid_documents filter here, as get_documents already handles it
-        # Sort documents by upload_date for easier selection of recent ones
-        documents.sort(key=lambda x: datetime.fromisoformat(x['upload_date']) if isinstance(x['upload_date'], str) else x['upload_date'], reverse=True)
-        
-        doc_options = {f"{doc['filename']} (Uploaded: {doc['upload_date']})": doc['_id'] for doc in documents}
-        selected_doc_display = st.selectbox("Select a document to delete", list(doc_options.keys()))
+        # Already sorted newest first by fetch_documents, for easier selection of recent ones
+        doc_options, _ = document_index(tuple(doc['_id'] for doc in documents), documents)
+        selected_doc_display = st.selectbox("Select a document to delete", doc_options)
         
         if st.button("Confirm Delete", help="This action cannot be undone."):
             if selected_doc_display:
@@ -224,14 +487,16 @@ elif selected_action == "Delete Document":
                 # doc_id_to_delete should always be valid here due to get_documents processing
                 with st.spinner(f"Deleting document '{selected_doc_display}'..."): # Added spinner
                     try:
-                        response = requests.delete(f"{BACKEND_URL}/documents/{doc_id_to_delete}", headers=get_auth_headers())
+                        response = get_session().delete(f"{DOCUMENTS_URL}{doc_id_to_delete}", headers=get_auth_headers())
                         response.raise_for_status()
+                        fetch_documents.clear()
                         st.success(f"Document '{selected_doc_display}' deleted successfully!")
                         st.rerun() # Refresh the page to update the document list
                     except requests.exceptions.RequestException as e:
-                        error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                        error_detail = get_error_detail(e)
                         st.error(f"Failed to delete document: {error_detail}. Please try again or check backend logs.")
-                        st.error(f"Response content: {e.response.content}")
+                        if e.response is not None:
+                            st.error(f"Response content: {e.response.content}")
     else:
         st.info("No documents to delete.")
 
@@ -259,7 +524,9 @@ elif selected_action == "Upload Document":
         if submitted and uploaded_files:
             files_to_send = []
             for file in uploaded_files:
-                files_to_send.append(('files', (file.name, file.getvalue(), file.type)))
+                # Pass the in-memory upload itself; getvalue() would make another full copy of every file
+                file.seek(0)
+                files_to_send.append(('files', (file.name, file, file.type)))
             
             data = {
                 'category': category, 
@@ -273,17 +540,21 @@ elif selected_action == "Upload Document":
 
             with st.spinner(f"Uploading and processing {len(uploaded_files)} document(s)... This may take a moment."):
                 try:
-                    response = requests.post(f"{BACKEND_URL}/upload/", files=files_to_send, data=data, headers=get_auth_headers())
+                    response = get_session().post(UPLOAD_URL, files=files_to_send, data=data, headers=get_auth_headers())
                     response.raise_for_status()
                     
-                    response_data = response.json()
+                    response_data = parse_json(response)
+                    uploaded_documents = response_data.get("uploaded_documents", [])
+                    any_processed = any(doc_info.get("status") != "failed" for doc_info in uploaded_documents)
+                    if any_processed:
+                        fetch_documents.clear()
                     
                     if response.status_code == 200:
                         st.success(response_data.get("message", "Documents uploaded successfully!"))
                     elif response.status_code == 207: # Multi-Status
                         st.warning(response_data.get("message", "Some documents failed to upload/process. Check individual statuses below."))
                     
-                    for doc_info in response_data.get("uploaded_documents", []):
+                    for doc_info in uploaded_documents:
                         if doc_info.get("status") == "failed":
                             st.error(f"Failed to process '{doc_info.get('filename')}': {doc_info.get('detail')}. Please check the file format or content.")
                         else:
@@ -295,14 +566,18 @@ elif selected_action == "Upload Document":
                             st.session_state['last_uploaded_document'] = doc_info
                             st.session_state['potential_reminders_to_create'] = doc_info.get('potential_reminders', [])
                     
-                    st.rerun() # Rerun to display reminders outside the form and update document list
+                    # Rerun to display reminders outside the form and update document list; with nothing
+                    # processed there's neither, and the errors above stay on screen
+                    if any_processed:
+                        st.rerun()
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     if "password-protected" in error_detail.lower() or "encrypted" in error_detail.lower():
                         st.error(f"Error: One or more PDFs are password-protected or encrypted. Please provide the correct password.")
                     else:
                         st.error(f"Error uploading documents: {error_detail}. Please ensure the backend is running and the file is valid.")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
     
     # Display potential reminders if any were found in the last upload
     if 'potential_reminders_to_create' in st.session_state and st.session_state['potential_reminders_to_create']:
@@ -321,21 +596,26 @@ elif selected_action == "Upload Document":
 
         if st.button("Create Selected Reminders"):
             if 'currently_selected_reminders' in st.session_state and st.session_state['currently_selected_reminders']:
+                selected_reminders = st.session_state['currently_selected_reminders']
+                reminder_payloads = [
+                    {
+                        "document_id": st.session_state['last_uploaded_document']['id'],
+                        "due_date": reminder_data['date'], # Send as YYYY-MM-DD string
+                        "message": reminder_data['message']
+                    }
+                    for reminder_data in selected_reminders
+                ]
                 with st.spinner("Creating reminders..."):
-                    for reminder_data in st.session_state['currently_selected_reminders']:
-                        try:
-                            due_datetime_str = reminder_data['date']
-                            
-                            reminder_payload = {
-                                "document_id": st.session_state['last_uploaded_document']['id'],
-                                "due_date": due_datetime_str, # Send as YYYY-MM-DD string
-                                "message": reminder_data['message']
-                            }
-                            rem_response = requests.post(f"{BACKEND_URL}/reminders/", json=reminder_payload, headers=get_auth_headers())
-                            rem_response.raise_for_status()
-                            st.success(f"Reminder '{reminder_data['message']}' created successfully!")
-                        except requests.exceptions.RequestException as rem_e:
-                            st.error(f"Failed to create reminder '{reminder_data['message']}': {rem_e}. Please try again.")
+                    try:
+                        # All selected reminders are created in one request
+                        rem_response = get_session().post(f"{REMINDERS_URL}batch", json=reminder_payloads, headers=get_auth_headers())
+                        rem_response.raise_for_status()
+                        fetch_reminders.clear()
+                        for created_reminder in parse_json(rem_response):
+                            st.success(f"Reminder '{created_reminder['message']}' created successfully!")
+                    except requests.exceptions.RequestException as rem_e:
+                        st.error(f"Failed to create the selected reminders: {rem_e}. Please try again.")
+                        if rem_e.response is not None:
                             st.error(f"Response content: {rem_e.response.content}")
                 
                 # Clear potential reminders from session state after creation attempt
@@ -358,26 +638,42 @@ elif selected_action == "Search Documents":
             data = {'query': search_query, 'search_type': search_type}
             with st.spinner("Searching documents..."):
                 try:
-                    response = requests.post(f"{BACKEND_URL}/search/", json=data, headers=get_auth_headers())
+                    response = get_session().post(SEARCH_URL, json=data, headers=get_auth_headers())
                     response.raise_for_status()
-                    results = response.json()
-                    
-                    if results:
-                        st.subheader("Search Results")
-                        for result in results:
-                            with st.expander(f"📄 {result['filename']} (Category: {result.get('category', 'N/A')})"):
-                                st.write(f"**Summary:** {result.get('summary', 'N/A')}")
-                                st.write(f"**Upload Date:** {result['upload_date']}")
-                                if result.get('original_filepath'):
-                                    st.write(f"**Original Location:** `{result['original_filepath']}`")
-                                st.write(f"**Tags:** {', '.join(result.get('tags', []))}")
-                                st.text_area("Extracted Text", result.get('extracted_text', ''), height=200, key=f"extracted_text_{result['_id']}")
-                    else:
-                        st.info("No results found for your query.")
+                    # Kept in session state so the "Show full text" buttons, which rerun the page, don't clear them
+                    st.session_state['search_results'] = parse_json(response)
+                    st.session_state['search_full_text_ids'] = set()
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     st.error(f"Error during search: {error_detail}. Please check your query and ensure the backend is running.")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
+
+    results = st.session_state.get('search_results')
+    if results is not None:
+        if results:
+            st.subheader("Search Results")
+            for result in results:
+                with st.expander(f"📄 {result['filename']} (Category: {result.get('category', 'N/A')})"):
+                    st.write(f"**Summary:** {result.get('summary', 'N/A')}")
+                    st.write(f"**Upload Date:** {result['upload_date']}")
+                    if result.get('original_filepath'):
+                        st.write(f"**Original Location:** `{result['original_filepath']}`")
+                    st.write(f"**Tags:** {', '.join(result.get('tags', []))}")
+                    st.write(f"**Excerpt:** {result.get('snippet', '')}")
+
+                    # The full text is only fetched for results the user opens
+                    shown_ids = st.session_state['search_full_text_ids']
+                    if result['_id'] not in shown_ids and st.button("Show full text", key=f"show_full_text_{result['_id']}"):
+                        shown_ids.add(result['_id'])
+                    if result['_id'] in shown_ids:
+                        try:
+                            full_document = fetch_document(st.session_state['token'], result['_id'])
+                            st.text_area("Extracted Text", full_document.get('extracted_text', ''), height=200, key=f"extracted_text_{result['_id']}")
+                        except requests.exceptions.RequestException as e:
+                            st.error(f"Failed to load the document text: {e}. Please ensure the backend is running.")
+        else:
+            st.info("No results found for your query.")
 
 elif selected_action == "Document Q&A":
     st.header("❓ Ask a Question About a Document")
@@ -387,17 +683,15 @@ elif selected_action == "Document Q&A":
     if not documents:
         st.warning("Please upload a document first to use this feature.")
     else:
-        # Sort documents by upload_date for easier selection of recent ones
-        documents.sort(key=lambda x: datetime.fromisoformat(x['upload_date']) if isinstance(x['upload_date'], str) else x['upload_date'], reverse=True)
-        
-        doc_options = {f"{doc['filename']} (Uploaded: {doc['upload_date']})": doc['_id'] for doc in documents}
-        selected_doc_display = st.selectbox("Select a document to ask a question about", list(doc_options.keys()))
+        # Already sorted newest first by fetch_documents, for easier selection of recent ones
+        doc_options, positions = document_index(tuple(doc['_id'] for doc in documents), documents)
+        selected_doc_display = st.selectbox("Select a document to ask a question about", doc_options)
         
         # Extract the actual doc_id from the selected display string
         selected_doc_id = doc_options[selected_doc_display]
         
         # Display original file path if available
-        selected_document = next((doc for doc in documents if doc['_id'] == selected_doc_id), None)
+        selected_document = documents[positions[selected_doc_id]]
         if selected_document and selected_document.get('original_filepath'):
             st.info(f"**Original File Location:** `{selected_document['original_filepath']}`")
 
@@ -407,20 +701,21 @@ elif selected_action == "Document Q&A":
             if selected_doc_display and question:
                 doc_id = selected_doc_id # Use the extracted doc_id
                 
-                with st.spinner("Getting answer from the document..."):
-                    try:
-                        data = {'document_id': doc_id, 'question': question}
-                        response = requests.post(f"{BACKEND_URL}/qa/", json=data, headers=get_auth_headers())
+                try:
+                    data = {'document_id': doc_id, 'question': question}
+                    with st.spinner("Getting answer from the document..."):
+                        response = get_session().post(QA_STREAM_URL, json=data, headers=get_auth_headers(), stream=True)
                         response.raise_for_status()
-                        answer = response.json().get('answer')
-                        st.markdown("### Answer")
-                        if answer:
-                            st.info(str(answer)) # Ensure answer is a string
-                        else:
-                            st.warning("No answer could be retrieved for your question from this document.")
-                    except requests.exceptions.RequestException as e:
-                        error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
-                        st.error(f"Failed to get answer: {error_detail}. Please ensure the backend is running and the document has extracted text.")
+                    st.markdown("### Answer")
+                    # Shown as the backend generates it, instead of after the whole answer is ready
+                    with response:
+                        answer = st.write_stream(response.iter_content(chunk_size=None, decode_unicode=True))
+                    if not answer:
+                        st.warning("No answer could be retrieved for your question from this document.")
+                except requests.exceptions.RequestException as e:
+                    error_detail = get_error_detail(e)
+                    st.error(f"Failed to get answer: {error_detail}. Please ensure the backend is running and the document has extracted text.")
+                    if e.response is not None:
                         st.error(f"Response content: {e.response.content}")
 
 elif selected_action == "Manage Reminders":
@@ -430,92 +725,43 @@ elif selected_action == "Manage Reminders":
     st.subheader("Create a New Reminder")
     
     documents = get_documents() # Now get_documents returns already processed and valid documents
-    doc_options = {doc['filename']: doc['_id'] for doc in documents}
-    selected_doc_name = st.selectbox("Select a document", list(doc_options.keys()))
+    # Same cached labels as Delete and Q&A; they also keep same-named documents apart
+    doc_options, _ = document_index(tuple(doc['_id'] for doc in documents), documents)
+
+    # The inputs only rerun the page when the form is submitted, not on every change
+    with st.form("new_reminder_form"):
+        selected_doc_name = st.selectbox("Select a document", doc_options)
     
-    due_date = st.date_input("Due Date")
-    due_time = st.time_input("Due Time")
-    message = st.text_input("Reminder Message")
+        due_date = st.date_input("Due Date")
+        due_time = st.time_input("Due Time")
+        message = st.text_input("Reminder Message")
     
-    if st.button("Set Reminder"):
-        if selected_doc_name and message:
-            doc_id = doc_options[selected_doc_name]
-            due_datetime = datetime.combine(due_date, due_time)
+        submitted = st.form_submit_button("Set Reminder")
+    
+        if submitted:
+            if selected_doc_name and message:
+                doc_id = doc_options[selected_doc_name]
+                due_datetime = datetime.combine(due_date, due_time)
             
-            reminder_data = {
-                "document_id": doc_id,
-                "due_date": due_datetime.isoformat(),
-                "message": message
-            }
+                reminder_data = {
+                    "document_id": doc_id,
+                    "due_date": due_datetime.isoformat(),
+                    "message": message
+                }
             
-            with st.spinner("Setting reminder..."):
-                try:
-                    response = requests.post(f"{BACKEND_URL}/reminders/", json=reminder_data, headers=get_auth_headers())
-                    response.raise_for_status()
-                    st.success("Reminder set successfully!")
-                    st.rerun()
-                except requests.exceptions.RequestException as e:
-                    st.error(f"Failed to set reminder: {e}. Please check your input and ensure the backend is running.")
-                    st.error(f"Response content: {e.response.content}")
+                with st.spinner("Setting reminder..."):
+                    try:
+                        response = get_session().post(REMINDERS_URL, json=reminder_data, headers=get_auth_headers())
+                        response.raise_for_status()
+                        fetch_reminders.clear()
+                        st.success("Reminder set successfully!")
+                        st.rerun()
+                    except requests.exceptions.RequestException as e:
+                        st.error(f"Failed to set reminder: {e}. Please check your input and ensure the backend is running.")
+                        if e.response is not None:
+                            st.error(f"Response content: {e.response.content}")
 
-    st.subheader("Upcoming Reminders")
-    try:
-        response = requests.get(f"{BACKEND_URL}/reminders/", headers=get_auth_headers())
-        response.raise_for_status()
-        reminders = response.json()
-        if reminders:
-            df_reminders = pd.DataFrame(reminders)
-            df_reminders['due_date'] = pd.to_datetime(df_reminders['due_date'])
-            
-            # Display reminders with actions
-            for i, reminder in df_reminders.sort_values(by="due_date").iterrows():
-                # Ensure _id is not None before proceeding
-                if reminder.get('_id') is None:
-                    st.warning(f"A reminder entry could not be loaded due to a missing or invalid ID. Please check the backend logs for details.")
-                    continue
-
-                col1, col2, col3, col4, col5 = st.columns([0.5, 2, 1.5, 1, 1])
-                with col1:
-                    st.write(f"**Status:** {reminder['status'].capitalize()}")
-                with col2:
-                    st.write(f"**Message:** {reminder['message']}")
-                with col3:
-                    st.write(f"**Due Date:** {reminder['due_date'].strftime('%Y-%m-%d %H:%M')}")
-                with col4:
-                    if reminder['status'] == 'pending':
-                        if st.button("Mark as Done", key=f"mark_done_{reminder['_id']}"):
-                            try:
-                                response = requests.put(f"{BACKEND_URL}/reminders/{reminder['_id']}/status", json={"status": "done"}, headers=get_auth_headers())
-                                response.raise_for_status()
-                                st.success("Reminder marked as done!")
-                                st.rerun()
-                            except requests.exceptions.RequestException as e:
-                                st.error(f"Failed to mark reminder as done: {e}. Please try again.")
-                    else:
-                        if st.button("Mark as Pending", key=f"mark_pending_{reminder['_id']}"):
-                            try:
-                                response = requests.put(f"{BACKEND_URL}/reminders/{reminder['_id']}/status", json={"status": "pending"}, headers=get_auth_headers())
-                                response.raise_for_status()
-                                st.success("Reminder marked as pending!")
-                                st.rerun()
-                            except requests.exceptions.RequestException as e:
-                                st.error(f"Failed to mark reminder as pending: {e}. Please try again.")
-                with col5:
-                    if st.button("Delete", key=f"delete_rem_{reminder['_id']}"):
-                        try:
-                            response = requests.delete(f"{BACKEND_URL}/reminders/{reminder['_id']}", headers=get_auth_headers())
-                            response.raise_for_status()
-                            st.success("Reminder deleted successfully!")
-                            st.rerun()
-                        except requests.exceptions.RequestException as e:
-                            st.error(f"Failed to delete reminder: {e}. Please try again.")
-            
-        else:
-            st.info("No upcoming reminders.")
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to fetch reminders: {e}. Please ensure the backend is running.")
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to fetch reminders: {e}. Please ensure the backend is running.")
+    render_upcoming_reminders()
 
 elif selected_action == "FAISS Management":
     st.header("⚙️ FAISS Index Management")
@@ -526,24 +772,26 @@ elif selected_action == "FAISS Management":
         if st.button("Clear FAISS Index", help="This will remove all documents from the semantic search index."):
             with st.spinner("Clearing FAISS index..."):
                 try:
-                    response = requests.post(f"{BACKEND_URL}/faiss/clear", headers=get_auth_headers())
+                    response = get_session().post(FAISS_CLEAR_URL, headers=get_auth_headers())
                     response.raise_for_status()
                     st.success("FAISS index cleared successfully!")
                     st.rerun()
                 except requests.exceptions.RequestException as e:
                     st.error(f"Failed to clear FAISS index: {e}. Please ensure the backend is running.")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
     with col2:
         if st.button("Rebuild FAISS Index", help="This will re-index all documents from the database for semantic search."):
             with st.spinner("Rebuilding FAISS index from all documents..."):
                 try:
-                    response = requests.post(f"{BACKEND_URL}/faiss/rebuild", headers=get_auth_headers())
+                    response = get_session().post(FAISS_REBUILD_URL, headers=get_auth_headers())
                     response.raise_for_status()
                     st.success("FAISS index rebuilt successfully!")
                     st.rerun()
                 except requests.exceptions.RequestException as e:
                     st.error(f"Failed to rebuild FAISS index: {e}. Please ensure the backend is running.")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
 
 elif selected_action == "Backup Data":
     st.header("📦 Backup Indexed Documents")
@@ -556,13 +804,14 @@ elif selected_action == "Backup Data":
         if backup_folder_path:
             with st.spinner("Backing up documents..."):
                 try:
-                    response = requests.post(f"{BACKEND_URL}/backup/documents", json={"backup_path": backup_folder_path}, headers=get_auth_headers())
+                    response = get_session().post(BACKUP_URL, json={"backup_path": backup_folder_path}, headers=get_auth_headers())
                     response.raise_for_status()
-                    st.success(response.json().get("message", "Backup initiated successfully!"))
+                    st.success(parse_json(response).get("message", "Backup initiated successfully!"))
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     st.error(f"Failed to initiate backup: {error_detail}. Please check the backup path and backend logs.")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
         else:
             st.warning("Please provide a backup folder path.")
 
@@ -571,33 +820,42 @@ elif selected_action == "Manage Uploaded Files":
     st.write("Here you can view and manually delete files that are currently in the 'uploads' directory. These are temporary files that were not automatically deleted or are awaiting processing.")
 
     try:
-        response = requests.get(f"{BACKEND_URL}/files/uploaded", headers=get_auth_headers())
-        response.raise_for_status()
-        uploaded_files = response.json()
+        uploaded_files = fetch_uploaded_files(st.session_state['token'])
 
         if uploaded_files:
             st.subheader("Files in 'uploads' directory:")
-            for file_info in uploaded_files:
-                filename = file_info['filename']
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.write(f"- {filename}")
-                with col2:
-                    if st.button(f"Delete {filename}", key=f"delete_uploaded_{filename}", help="Permanently delete this file from the 'uploads' directory."):
-                        try:
-                            delete_response = requests.delete(f"{BACKEND_URL}/files/uploaded/{filename}", headers=get_auth_headers())
-                            delete_response.raise_for_status()
-                            st.success(f"File '{filename}' deleted successfully!")
+            # Ticking boxes doesn't rerun the page; the selected files are deleted in one request on submit
+            with st.form("delete_uploaded_files_form"):
+                selected_filenames = [
+                    file_info['filename'] for file_info in uploaded_files
+                    if st.checkbox(file_info['filename'], key=f"delete_uploaded_{file_info['filename']}")
+                ]
+                submitted = st.form_submit_button("Delete Selected", help="Permanently delete the selected files from the 'uploads' directory.")
+
+            if submitted:
+                if selected_filenames:
+                    try:
+                        delete_response = get_session().post(f"{UPLOADED_FILES_URL}/batch-delete", json={"filenames": selected_filenames}, headers=get_auth_headers())
+                        delete_response.raise_for_status()
+                        fetch_uploaded_files.clear()
+                        delete_result = parse_json(delete_response)
+                        for failure in delete_result.get("failed", []):
+                            st.error(f"Failed to delete file '{failure.get('filename')}': {failure.get('detail')}")
+                        if not delete_result.get("failed"):
                             st.rerun() # Refresh the page to update the list
-                        except requests.exceptions.RequestException as e:
-                            st.error(f"Failed to delete file '{filename}': {e}. Please try again or check backend logs.")
+                    except requests.exceptions.RequestException as e:
+                        st.error(f"Failed to delete the selected files: {e}. Please try again or check backend logs.")
+                        if e.response is not None:
                             st.error(f"Response content: {e.response.content}")
+                else:
+                    st.warning("Please select at least one file to delete.")
         else:
             st.info("No files found in the 'uploads' directory.")
 
     except requests.exceptions.RequestException as e:
         st.error(f"Failed to fetch uploaded files: {e}. Please ensure the backend is running.")
-        st.error(f"Response content: {e.response.content}")
+        if e.response is not None:
+            st.error(f"Response content: {e.response.content}")
 
 elif selected_action == "Chat with AI":
     st.header("💬 Chat with AI")
@@ -616,15 +874,27 @@ elif selected_action == "Chat with AI":
     # Sidebar for conversation selection
     st.sidebar.subheader("Your Conversations")
     
-    # Fetch conversations
-    conversations = []
-    try:
-        response = requests.get(f"{BACKEND_URL}/conversations/", headers=get_auth_headers())
-        response.raise_for_status()
-        conversations = response.json()
-        # DEBUG: Fetched conversations from backend: {conversations}
-    except requests.exceptions.RequestException as e:
-        st.sidebar.error(f"Failed to fetch conversations: {e}. Please ensure the backend is running.")
+    # Conversations and the current conversation's messages are kept in session state, so reruns that
+    # don't change the conversation (or send/delete anything) make no requests. Whatever is missing is
+    # fetched concurrently.
+    messages_url = f"{CONVERSATIONS_URL}{st.session_state['current_conversation_id']}/messages" if st.session_state['current_conversation_id'] else None
+    need_conversations = 'chat_conversations' not in st.session_state
+    need_messages = messages_url is not None and st.session_state.get('chat_messages_conversation_id') != st.session_state['current_conversation_id']
+    # Messages prefetched on an earlier run (see below) are used instead of a new request
+    prefetched_messages = st.session_state.setdefault('chat_prefetched_messages', {})
+    prefetched = prefetched_messages.pop(st.session_state['current_conversation_id'], None) if need_messages else None
+    fetches = parallel_get([url for url, needed in ((CONVERSATIONS_URL, need_conversations), (messages_url, need_messages and prefetched is None)) if needed])
+    if prefetched is not None:
+        fetches[messages_url] = prefetched
+
+    conversations = st.session_state.get('chat_conversations', [])
+    if need_conversations:
+        try:
+            conversations = parse_json(fetches[CONVERSATIONS_URL].result())
+            st.session_state['chat_conversations'] = conversations
+            # DEBUG: Fetched conversations from backend: {conversations}
+        except requests.exceptions.RequestException as e:
+            st.sidebar.error(f"Failed to fetch conversations: {e}. Please ensure the backend is running.")
 
     conversation_options = {"New Chat": None}
     if conversations:
@@ -641,10 +911,16 @@ elif selected_action == "Chat with AI":
             conversation_options[display_key] = conv_id
     # DEBUG: Constructed conversation_options: {conversation_options}
 
+    # Start fetching the most recent other conversations' messages in the background, so switching to
+    # one of them doesn't wait on the backend
+    session, headers = get_session(), get_auth_headers()
+    for conv_id in list(conversation_options.values())[1:CHAT_PREFETCH_CONVERSATIONS + 1]:
+        if conv_id != st.session_state['current_conversation_id'] and conv_id not in prefetched_messages:
+            prefetched_messages[conv_id] = get_prefetch_pool().submit(checked_get, session, f"{CONVERSATIONS_URL}{conv_id}/messages", headers)
+
     # Determine the initial index for the selectbox
-    initial_index = 0
-    if st.session_state['current_conversation_id'] in conversation_options.values():
-        initial_index = list(conversation_options.values()).index(st.session_state['current_conversation_id'])
+    conversation_positions = {conv_id: i for i, conv_id in enumerate(conversation_options.values())}
+    initial_index = conversation_positions.get(st.session_state['current_conversation_id'], 0)
     # DEBUG: Initial selectbox index: {initial_index}
 
     def update_conversation_selection():
@@ -656,7 +932,7 @@ elif selected_action == "Chat with AI":
     # Selectbox for conversations
     selected_conv_display = st.sidebar.selectbox(
         "Select or create a conversation",
-        list(conversation_options.keys()),
+        conversation_options,
         index=initial_index,
         key="conversation_selector_key", # Add a unique key
         on_change=update_conversation_selection # Use a callback
@@ -670,17 +946,18 @@ elif selected_action == "Chat with AI":
     chat_container = st.container(height=400, border=True)
 
     # Fetch and display messages for the current conversation
-    messages = []
-    if st.session_state['current_conversation_id']:
+    messages = st.session_state['chat_messages'] if messages_url and not need_messages else []
+    if need_messages:
         try:
-            response = requests.get(f"{BACKEND_URL}/conversations/{st.session_state['current_conversation_id']}/messages", headers=get_auth_headers())
-            response.raise_for_status()
+            response = fetches[messages_url].result()
             # Check if response content is empty or malformed
             if not response.text.strip():
                 st.warning("Received empty response for messages. This might indicate no messages or a backend issue.")
                 messages = []
             else:
-                messages = response.json()
+                messages = parse_json(response)
+            st.session_state['chat_messages'] = messages
+            st.session_state['chat_messages_conversation_id'] = st.session_state['current_conversation_id']
             
             # DEBUG: Raw response text for messages: {response.text}
             # DEBUG: Fetched messages for current conversation: {messages}
@@ -690,8 +967,12 @@ elif selected_action == "Chat with AI":
             st.error(f"Failed to decode messages from backend: {e}. Raw response: {response.text}. Please check backend logs.")
             messages = []
     
-    for msg in messages:
-        with chat_container:
+    with chat_container:
+        # Older history is rendered as one markdown block; only the latest messages get chat bubbles
+        history, recent = messages[:-CHAT_RECENT_MESSAGES], messages[-CHAT_RECENT_MESSAGES:]
+        if history:
+            st.markdown("\n\n".join(f"**{'You' if msg['sender'] == 'user' else 'AI'}:** {msg['message']}" for msg in history))
+        for msg in recent:
             if msg['sender'] == 'user':
                 st.chat_message("user").write(msg['message'])
             else:
@@ -707,9 +988,10 @@ elif selected_action == "Chat with AI":
                 
                 # If "New Chat" is selected, create a new conversation first
                 if conversation_id_to_use is None:
-                    create_conv_response = requests.post(f"{BACKEND_URL}/conversations/", json={"title": "New Chat"}, headers=get_auth_headers())
+                    create_conv_response = get_session().post(CONVERSATIONS_URL, json={"title": "New Chat"}, headers=get_auth_headers())
                     create_conv_response.raise_for_status()
-                    new_conv = create_conv_response.json()
+                    new_conv = parse_json(create_conv_response)
+                    reset_chat_cache()
                     # The backend returns '_id' as per Pydantic alias, not 'id'
                     conversation_id_to_use = new_conv['_id'] 
                     st.session_state['current_conversation_id'] = conversation_id_to_use
@@ -718,20 +1000,37 @@ elif selected_action == "Chat with AI":
                 
                 # Send user message to backend and get AI response
                 message_payload = {"message": user_input}
-                response = requests.post(
-                    f"{BACKEND_URL}/conversations/{conversation_id_to_use}/send", # Corrected endpoint to /send
+                response = get_session().post(
+                    f"{CONVERSATIONS_URL}{conversation_id_to_use}/send", # Corrected endpoint to /send
                     json=message_payload,
                     headers=get_auth_headers()
                 )
                 response.raise_for_status()
                 
-                # The backend /conversations/{conversation_id}/messages endpoint returns the AI's ChatMessage object
-                # The frontend should just trigger a rerun to fetch all messages again.
+                cached_messages = st.session_state.get('chat_messages')
+                if cached_messages and st.session_state.get('chat_messages_conversation_id') == conversation_id_to_use:
+                    # Only the messages this send added (the user's and the AI's) are fetched and appended
+                    # to the cached conversation, instead of refetching all of it
+                    try:
+                        new_messages_response = get_session().get(
+                            f"{CONVERSATIONS_URL}{conversation_id_to_use}/messages",
+                            params={"after": cached_messages[-1]['_id']},
+                            headers=get_auth_headers()
+                        )
+                        new_messages_response.raise_for_status()
+                        st.session_state['chat_messages'] = cached_messages + parse_json(new_messages_response)
+                        if st.session_state['current_conversation_title'] == "New Chat":
+                            st.session_state.pop('chat_conversations', None) # The first message renames the conversation
+                    except requests.exceptions.RequestException:
+                        reset_chat_cache() # The message was sent; refetch the whole conversation instead
+                else:
+                    reset_chat_cache()
                 st.rerun()
             except requests.exceptions.RequestException as e:
-                error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                error_detail = get_error_detail(e)
                 st.error(f"Failed to send message: {error_detail}. Please try again or check backend logs.")
-                st.error(f"Response content: {e.response.content}")
+                if e.response is not None:
+                    st.error(f"Response content: {e.response.content}")
             except Exception as e:
                 st.error(f"An unexpected error occurred: {e}. Please try again.")
                 st.error(f"Error details: {e}")
@@ -745,47 +1044,47 @@ elif selected_action == "Chat with AI":
             if st.button("Delete Current Conversation", help="This will delete the entire conversation history."):
                 if st.session_state['current_conversation_id']:
                     try:
-                        response = requests.delete(f"{BACKEND_URL}/conversations/{st.session_state['current_conversation_id']}", headers=get_auth_headers())
+                        response = get_session().delete(f"{CONVERSATIONS_URL}{st.session_state['current_conversation_id']}", headers=get_auth_headers())
                         response.raise_for_status()
                         st.success("Conversation deleted successfully!")
+                        reset_chat_cache()
                         st.session_state['current_conversation_id'] = None
                         st.session_state['current_conversation_title'] = "New Chat"
                         st.rerun()
                     except requests.exceptions.RequestException as e:
-                        error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                        error_detail = get_error_detail(e)
                         st.error(f"Failed to delete conversation: {error_detail}. Please try again or check backend logs.")
-                        st.error(f"Response content: {e.response.content}")
+                        if e.response is not None:
+                            st.error(f"Response content: {e.response.content}")
         with col_del_msg:
             if messages:
-                # Create a list of display strings for the selectbox
-                message_display_options = [
-                    f"{msg['sender'].capitalize()}: {msg['message'][:70]}{'...' if len(msg['message']) > 70 else ''} (ID: {msg['_id']})"
-                    for msg in messages
-                ]
-                # Map display string back to original message object or ID
-                message_map = {
-                    f"{msg['sender'].capitalize()}: {msg['message'][:70]}{'...' if len(msg['message']) > 70 else ''} (ID: {msg['_id']})": msg['_id']
-                    for msg in messages
-                }
+                # The selectbox returns the message's position, so labels are built once (by format_func)
+                # and no label-to-id map is needed
+                def message_label(i):
+                    msg = messages[i]
+                    return f"{msg['sender'].capitalize()}: {msg['message'][:70]}{'...' if len(msg['message']) > 70 else ''} (ID: {msg['_id']})"
 
-                message_to_delete_display = st.selectbox(
+                message_to_delete_index = st.selectbox(
                     "Select a message to delete",
-                    message_display_options,
+                    range(len(messages)),
+                    format_func=message_label,
                     key="delete_msg_select"
                 )
                 
                 if st.button("Delete Selected Message", key="confirm_delete_msg_button"):
-                    if message_to_delete_display:
-                        message_id_to_delete = message_map[message_to_delete_display]
+                    if message_to_delete_index is not None:
+                        message_id_to_delete = messages[message_to_delete_index]['_id']
                         try:
-                            response = requests.delete(f"{BACKEND_URL}/messages/{message_id_to_delete}", headers=get_auth_headers())
+                            response = get_session().delete(f"{MESSAGES_URL}{message_id_to_delete}", headers=get_auth_headers())
                             response.raise_for_status()
                             st.success("Message deleted successfully!")
+                            reset_chat_cache()
                             st.rerun()
                         except requests.exceptions.RequestException as e:
-                            error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                            error_detail = get_error_detail(e)
                             st.error(f"Failed to delete message: {error_detail}. Please try again or check backend logs.")
-                            st.error(f"Response content: {e.response.content}")
+                            if e.response is not None:
+                                st.error(f"Response content: {e.response.content}")
             else:
                 st.info("No messages in this conversation to delete.")
 
@@ -794,13 +1093,18 @@ elif selected_action == "Admin Feedback":
     st.write("Review and manage feedback provided for documents to improve AI performance.")
 
     try:
-        response = requests.get(f"{BACKEND_URL}/admin/feedback/", headers=get_auth_headers())
-        response.raise_for_status()
-        feedback_entries = response.json()
+        feedback_entries = fetch_feedback(st.session_state['token'])
 
         if feedback_entries:
             st.subheader("All Document Feedback Entries")
-            for feedback in feedback_entries:
+            # Only one page of expanders (and their text areas) is built per run
+            page_count = -(-len(feedback_entries) // FEEDBACK_PAGE_SIZE)
+            # Deleting feedback can leave the stored page past the last one, which the widget rejects
+            if st.session_state.get("feedback_page", 1) > page_count:
+                st.session_state["feedback_page"] = page_count
+            page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="feedback_page") if page_count > 1 else 1
+            page_start = (page - 1) * FEEDBACK_PAGE_SIZE
+            for feedback in feedback_entries[page_start:page_start + FEEDBACK_PAGE_SIZE]:
                 with st.expander(f"Feedback for Document ID: {feedback['document_id']} (Type: {feedback['feedback_type']})"):
                     st.write(f"**Feedback ID:** {feedback['_id']}")
                     st.write(f"**Admin User ID:** {feedback['user_id']}")
@@ -826,30 +1130,33 @@ elif selected_action == "Admin Feedback":
                     with col_delete:
                         if st.button("Delete Feedback", key=f"delete_feedback_{feedback['_id']}"):
                             try:
-                                delete_response = requests.delete(f"{BACKEND_URL}/admin/feedback/{feedback['_id']}", headers=get_auth_headers())
+                                delete_response = get_session().delete(f"{ADMIN_FEEDBACK_URL}{feedback['_id']}", headers=get_auth_headers())
                                 delete_response.raise_for_status()
+                                fetch_feedback.clear()
                                 st.success(f"Feedback {feedback['_id']} deleted successfully!")
                                 st.rerun()
                             except requests.exceptions.RequestException as e:
-                                error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                                error_detail = get_error_detail(e)
                                 st.error(f"Failed to delete feedback: {error_detail}")
-                                st.error(f"Response content: {e.response.content}")
+                                if e.response is not None:
+                                    st.error(f"Response content: {e.response.content}")
         else:
             st.info("No document feedback entries found.")
 
     except requests.exceptions.RequestException as e:
-        error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+        error_detail = get_error_detail(e)
         st.error(f"Failed to fetch feedback entries: {error_detail}. Please ensure the backend is running and you are logged in as an admin.")
-        st.error(f"Response content: {e.response.content}")
+        if e.response is not None:
+            st.error(f"Response content: {e.response.content}")
 
     st.subheader("Submit New Feedback")
     with st.form("new_feedback_form", clear_on_submit=True):
         documents = get_documents()
         doc_options = {f"{doc['filename']} (ID: {doc['_id']})": doc['_id'] for doc in documents}
-        selected_doc_display = st.selectbox("Select Document", list(doc_options.keys()), key="new_feedback_doc_select")
+        selected_doc_display = st.selectbox("Select Document", doc_options, key="new_feedback_doc_select")
         selected_doc_id = doc_options[selected_doc_display] if selected_doc_display else None
 
-        feedback_type = st.selectbox("Feedback Type", ["OCR_CORRECTION", "SUMMARY_ADJUSTMENT", "CATEGORY_ADJUSTMENT", "TAG_ADJUSTMENT", "PII_VALIDATION", "QA_CORRECTION", "OTHER"], key="new_feedback_type")
+        feedback_type = st.selectbox("Feedback Type", FEEDBACK_TYPES, key="new_feedback_type")
         field_name = st.text_input("Field Name (e.g., extracted_text, summary, category, tags, extracted_info.name)", key="new_feedback_field_name")
         original_content = st.text_area("Original Content (if applicable)", key="new_feedback_original_content")
         corrected_content = st.text_area("Corrected Content", key="new_feedback_corrected_content")
@@ -870,14 +1177,16 @@ elif selected_action == "Admin Feedback":
                     "notes": notes if notes else None
                 }
                 try:
-                    response = requests.post(f"{BACKEND_URL}/admin/feedback/", json=feedback_payload, headers=get_auth_headers())
+                    response = get_session().post(ADMIN_FEEDBACK_URL, json=feedback_payload, headers=get_auth_headers())
                     response.raise_for_status()
+                    fetch_feedback.clear()
                     st.success("Feedback submitted successfully!")
                     st.rerun()
                 except requests.exceptions.RequestException as e:
-                    error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                    error_detail = get_error_detail(e)
                     st.error(f"Failed to submit feedback: {error_detail}")
-                    st.error(f"Response content: {e.response.content}")
+                    if e.response is not None:
+                        st.error(f"Response content: {e.response.content}")
 
     # Edit Feedback Form (appears when 'Edit Feedback' button is clicked)
     if 'edit_feedback_id' in st.session_state and st.session_state['edit_feedback_id']:
@@ -886,7 +1195,7 @@ elif selected_action == "Admin Feedback":
 
         with st.form("edit_feedback_form", clear_on_submit=False):
             # Pre-fill fields with existing data
-            edit_feedback_type = st.selectbox("Feedback Type", ["OCR_CORRECTION", "SUMMARY_ADJUSTMENT", "CATEGORY_ADJUSTMENT", "TAG_ADJUSTMENT", "PII_VALIDATION", "QA_CORRECTION", "OTHER"], index=["OCR_CORRECTION", "SUMMARY_ADJUSTMENT", "CATEGORY_ADJUSTMENT", "TAG_ADJUSTMENT", "PII_VALIDATION", "QA_CORRECTION", "OTHER"].index(feedback_to_edit['feedback_type']), key="edit_feedback_type")
+            edit_feedback_type = st.selectbox("Feedback Type", FEEDBACK_TYPES, index=FEEDBACK_TYPE_INDEX.get(feedback_to_edit['feedback_type'], 0), key="edit_feedback_type")
             edit_field_name = st.text_input("Field Name", value=feedback_to_edit.get('field_name', ''), key="edit_feedback_field_name")
             edit_original_content = st.text_area("Original Content", value=feedback_to_edit.get('original_content', ''), key="edit_feedback_original_content")
             edit_corrected_content = st.text_area("Corrected Content", value=feedback_to_edit.get('corrected_content', ''), key="edit_feedback_corrected_content")
@@ -907,16 +1216,18 @@ elif selected_action == "Admin Feedback":
                             "notes": edit_notes if edit_notes else None
                         }
                         try:
-                            response = requests.put(f"{BACKEND_URL}/admin/feedback/{st.session_state['edit_feedback_id']}", json=update_payload, headers=get_auth_headers())
+                            response = get_session().put(f"{ADMIN_FEEDBACK_URL}{st.session_state['edit_feedback_id']}", json=update_payload, headers=get_auth_headers())
                             response.raise_for_status()
+                            fetch_feedback.clear()
                             st.success("Feedback updated successfully!")
                             del st.session_state['edit_feedback_id']
                             del st.session_state['edit_feedback_data']
                             st.rerun()
                         except requests.exceptions.RequestException as e:
-                            error_detail = e.response.json().get("detail", str(e)) if e.response else str(e)
+                            error_detail = get_error_detail(e)
                             st.error(f"Failed to update feedback: {error_detail}")
-                            st.error(f"Response content: {e.response.content}")
+                            if e.response is not None:
+                                st.error(f"Response content: {e.response.content}")
             with col_cancel:
                 if st.form_submit_button("Cancel Edit"):
                     del st.session_state['edit_feedback_id']
@@ -1,58 +1,88 @@
 import os
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+def _generate_box_file(image_dir, filename, lang):
+    """
+    Runs Tesseract's makebox for one image. Returns the lines to print for it, so that output from
+    images processed in parallel isn't interleaved.
+    """
+    image_path = os.path.join(image_dir, filename)
+    base_filename = os.path.splitext(filename)[0]
+    output_box_path = os.path.join(image_dir, f"{base_filename}.box")
+    messages = [f"  Generating box file for {filename}..."]
+
+    try:
+        # Tesseract command to generate box files
+        # tesseract [image_path] [output_base_name] -l [lang] --psm 6 makebox
+        # --psm 6: Assume a single uniform block of text.
+        command = [
+            'tesseract',
+            image_path,
+            os.path.join(image_dir, base_filename), # Tesseract expects output base name without extension
+            '-l', lang,
+            '--psm', '6',
+            'makebox'
+        ]
+
+        # One OpenMP thread per tesseract process: the executor already runs one process per core,
+        # and Tesseract's own threads would only oversubscribe the CPU
+        env = dict(os.environ, OMP_THREAD_LIMIT='1')
+        result = subprocess.run(command, capture_output=True, text=True, check=True, env=env)
+
+        if result.stderr:
+            messages.append(f"  Tesseract stderr for {filename}:\n{result.stderr}")
+
+        if os.path.exists(output_box_path):
+            messages.append(f"  Generated {output_box_path}")
+        else:
+            messages.append(f"  Error: Box file {output_box_path} was not created for {filename}.")
+
+    except subprocess.CalledProcessError as e:
+        messages.append(f"  Error generating box file for {filename}: {e}")
+        messages.append(f"  Command: {' '.join(e.cmd)}")
+        messages.append(f"  Stdout: {e.stdout}")
+        messages.append(f"  Stderr: {e.stderr}")
+    except Exception as e:
+        messages.append(f"  An unexpected error occurred for {filename}: {e}")
+    return messages
 
 def generate_box_files(image_dir, lang='kan'):
     """
     Generates .box files for each image in the specified directory using Tesseract.
     Requires Tesseract OCR to be installed and in the system's PATH.
+    Images are processed in parallel, one Tesseract process per CPU core.
     """
     print(f"Starting box file generation for language '{lang}'...")
 
+    # Checked up front rather than per image, so nothing is started without it
+    if shutil.which('tesseract') is None:
+        print("  Error: Tesseract command not found. Please ensure Tesseract OCR is installed and in your system's PATH.")
+        return
+
+    image_filenames = []
     for filename in os.listdir(image_dir):
         if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')):
-            image_path = os.path.join(image_dir, filename)
             base_filename = os.path.splitext(filename)[0]
             ground_truth_path = os.path.join(image_dir, f"{base_filename}.txt")
-            output_box_path = os.path.join(image_dir, f"{base_filename}.box")
 
             if not os.path.exists(ground_truth_path):
                 print(f"  Warning: Ground truth file '{ground_truth_path}' not found for '{filename}'. Skipping box file generation for this image.")
                 continue
 
-            try:
-                # Tesseract command to generate box files
-                # tesseract [image_path] [output_base_name] -l [lang] --psm 6 makebox
-                # --psm 6: Assume a single uniform block of text.
-                command = [
-                    'tesseract',
-                    image_path,
-                    os.path.join(image_dir, base_filename), # Tesseract expects output base name without extension
-                    '-l', lang,
-                    '--psm', '6',
-                    'makebox'
-                ]
-                
-                print(f"  Generating box file for {filename}...")
-                result = subprocess.run(command, capture_output=True, text=True, check=True)
-                
-                if result.stderr:
-                    print(f"  Tesseract stderr for {filename}:\n{result.stderr}")
-                
-                if os.path.exists(output_box_path):
-                    print(f"  Generated {output_box_path}")
-                else:
-                    print(f"  Error: Box file {output_box_path} was not created for {filename}.")
-
-            except subprocess.CalledProcessError as e:
-                print(f"  Error generating box file for {filename}: {e}")
-                print(f"  Command: {' '.join(e.cmd)}")
-                print(f"  Stdout: {e.stdout}")
-                print(f"  Stderr: {e.stderr}")
-            except FileNotFoundError:
-                print("  Error: Tesseract command not found. Please ensure Tesseract OCR is installed and in your system's PATH.")
-                return # Exit if tesseract is not found
-            except Exception as e:
-                print(f"  An unexpected error occurred for {filename}: {e}")
+            # Incremental runs: a box file newer than its image and ground truth doesn't need regenerating
+            output_box_path = os.path.join(image_dir, f"{base_filename}.box")
+            image_path = os.path.join(image_dir, filename)
+            if os.path.exists(output_box_path) and os.path.getmtime(output_box_path) >= max(os.path.getmtime(image_path), os.path.getmtime(ground_truth_path)):
+                print(f"  Up-to-date: {output_box_path}")
+                continue
+            image_filenames.append(filename)
+
+    # Threads are enough: the OCR itself runs in the tesseract processes
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for messages in executor.map(lambda filename: _generate_box_file(image_dir, filename, lang), image_filenames):
+            print("\n".join(messages))
 
     print("Box file generation complete.")
 
@@ -1,36 +1,86 @@
 import os
+import subprocess
+import tempfile
 from PIL import Image
 import pytesseract
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')
+
+def _save_ground_truth(output_txt_path, kannada_text):
+    with open(output_txt_path, 'w', encoding='utf-8') as f:
+        f.write(kannada_text.strip())
+
+def _ocr_in_one_run(image_paths):
+    """
+    OCRs all images with a single Tesseract process, via a list file of image paths, so the Kannada
+    model is loaded once instead of once per image. Returns one text per image, or None if the output
+    can't be matched up with the images (e.g. a multi-page TIFF), in which case the caller falls back
+    to OCRing them one at a time.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as list_file:
+        list_file.write("\n".join(os.path.abspath(path) for path in image_paths) + "\n")
+    try:
+        command = [pytesseract.pytesseract.tesseract_cmd, list_file.name, 'stdout', '-l', 'kan']
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"  Batch OCR failed ({e}); falling back to one image at a time.")
+        return None
+    finally:
+        os.remove(list_file.name)
+
+    # Tesseract ends every page with a form feed
+    pages = result.stdout.split('\f')
+    if pages and not pages[-1].strip():
+        pages.pop()
+    if len(pages) != len(image_paths):
+        print(f"  Batch OCR returned {len(pages)} pages for {len(image_paths)} images; falling back to one image at a time.")
+        return None
+    return pages
+
 def generate_kannada_ground_truth(image_dir):
     """
     Performs OCR on Kannada images and saves the recognized Kannada text as ground truth files.
     """
     print(f"Starting ground truth generation (OCR for Kannada text)...")
 
+    filenames, image_paths, output_txt_paths = [], [], []
     for filename in os.listdir(image_dir):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')):
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
             image_path = os.path.join(image_dir, filename)
-            base_filename = os.path.splitext(filename)[0]
-            output_txt_path = os.path.join(image_dir, f"{base_filename}.txt")
-
-            try:
-                # Step 1: Perform OCR using Tesseract to get Kannada text
-                print(f"  Performing OCR on {filename}...")
-                kannada_text = pytesseract.image_to_string(Image.open(image_path), lang='kan')
-                kannada_text = kannada_text.strip()
-
-                # Step 2: Save the recognized Kannada text as the ground truth file
-                with open(output_txt_path, 'w', encoding='utf-8') as f:
-                    f.write(kannada_text)
+            output_txt_path = os.path.join(image_dir, f"{os.path.splitext(filename)[0]}.txt")
+            # Incremental runs: ground truth newer than its image doesn't need regenerating
+            if os.path.exists(output_txt_path) and os.path.getmtime(output_txt_path) >= os.path.getmtime(image_path):
+                print(f"  Up-to-date: {output_txt_path}")
+                continue
+            filenames.append(filename)
+            image_paths.append(image_path)
+            output_txt_paths.append(output_txt_path)
+
+    if filenames:
+        print(f"  Performing OCR on {len(filenames)} images in one Tesseract run...")
+        pages = _ocr_in_one_run(image_paths)
+        if pages is not None:
+            for filename, output_txt_path, kannada_text in zip(filenames, output_txt_paths, pages):
+                _save_ground_truth(output_txt_path, kannada_text)
                 print(f"  Generated Kannada ground truth for {filename} at {output_txt_path}")
+            print("Ground truth generation complete.")
+            return
 
-            except Exception as e:
-                print(f"  Error processing {filename}: {e}")
-                # Create an empty ground truth file on error to avoid blocking subsequent steps
-                with open(output_txt_path, 'w', encoding='utf-8') as f:
-                    f.write("")
-                continue
+    for filename, image_path, output_txt_path in zip(filenames, image_paths, output_txt_paths):
+        try:
+            # Step 1: Perform OCR using Tesseract to get Kannada text
+            print(f"  Performing OCR on {filename}...")
+            kannada_text = pytesseract.image_to_string(Image.open(image_path), lang='kan')
+
+            # Step 2: Save the recognized Kannada text as the ground truth file
+            _save_ground_truth(output_txt_path, kannada_text)
+            print(f"  Generated Kannada ground truth for {filename} at {output_txt_path}")
+
+        except Exception as e:
+            print(f"  Error processing {filename}: {e}")
+            # Create an empty ground truth file on error to avoid blocking subsequent steps
+            _save_ground_truth(output_txt_path, "")
+            continue
 
     print("Ground truth generation complete.")
 
@@ -46,15 +96,14 @@ if __name__ == "__main__":
         print("Also, ensure 'pytesseract' Python library is installed: pip install pytesseract")
         exit()
     
-    # Check for Kannada language data
-    # This is a basic check and might not cover all Tesseract configurations
+    # Check for Kannada language data by listing Tesseract's installed languages, rather than running OCR
     try:
-        # Attempt to OCR a dummy image with 'kan' language to check if it's available
-        # This is a heuristic, a more robust check would involve Tesseract's API if available
-        dummy_image = Image.new('RGB', (100, 50), color = 'white')
-        pytesseract.image_to_string(dummy_image, lang='kan')
+        installed_languages = pytesseract.get_languages(config='')
     except Exception as e:
-        print(f"Kannada language data ('kan.traineddata') might not be installed for Tesseract or Tesseract is not configured correctly: {e}")
+        installed_languages = []
+        print(f"Could not list Tesseract's installed languages: {e}")
+    if 'kan' not in installed_languages:
+        print("Kannada language data ('kan.traineddata') might not be installed for Tesseract or Tesseract is not configured correctly.")
         print("Please ensure 'kan.traineddata' is in your Tesseract tessdata directory.")
         print("You can usually find language data here: https://tesseract-ocr.github.io/tessdoc/Data-Files.html")
         exit()
@@ -1,6 +1,11 @@
 import os
+import hashlib
+import shelve
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from google.cloud import translate_v2 as translate
-from PIL import Image
 import pytesseract
 
 # Set your Google Cloud project ID here
@@ -10,50 +15,196 @@ import pytesseract
 # Or by logging in via `gcloud auth application-default login`
 PROJECT_ID = "your-google-cloud-project-id" # IMPORTANT: Replace with your actual Google Cloud Project ID
 
-def generate_translated_ground_truth(image_dir, target_language='en'):
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'})
+
+# Google Cloud Translate v2 limits per request; texts are batched up to these
+TRANSLATE_MAX_SEGMENTS = 128
+TRANSLATE_MAX_CHARS = 30000
+
+TRANSLATION_CACHE_FILENAME = ".translation_cache" # shelve database in the image directory, keyed by target language and text hash
+
+LANGUAGE_DETECTION_SAMPLES = 5 # Texts the source language is detected from when it isn't given
+
+OCR_BATCH_SIZE = 40 # Most images OCRed by one tesseract process, which loads the Kannada model once for all of them
+
+@lru_cache(maxsize=1)
+def get_translate_client():
+    """The Google Cloud Translate client, created once and shared by the credentials check and the translation."""
+    return translate.Client(project=PROJECT_ID)
+
+def _write_ground_truth(output_txt_path, text):
+    # Raw fd write: one open/write/close per file, without a TextIOWrapper's buffering and checks
+    fd = os.open(output_txt_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        data = text.encode('utf-8')
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+def _translation_cache_key(kannada_text, target_language):
+    return f"{target_language}:{hashlib.sha256(kannada_text.encode('utf-8')).hexdigest()}"
+
+def _translation_batches(texts):
+    """Splits texts into consecutive batches within the per-request segment and character limits."""
+    batch, batch_chars = [], 0
+    for text in texts:
+        if batch and (len(batch) == TRANSLATE_MAX_SEGMENTS or batch_chars + len(text) > TRANSLATE_MAX_CHARS):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        yield batch
+
+def _ocr_image(image_dir, filename):
+    """
+    Step 1: Performs OCR using Tesseract to get the Kannada text of one image.
+    Returns (filename, output_txt_path, kannada_text, error); error is None on success.
+    """
+    image_path = os.path.join(image_dir, filename)
+    base_filename = os.path.splitext(filename)[0]
+    output_txt_path = os.path.join(image_dir, f"{base_filename}.txt")
+    try:
+        # Given the path, pytesseract hands the file straight to tesseract, instead of decoding it with
+        # PIL and re-encoding it to a temporary file
+        kannada_text = pytesseract.image_to_string(image_path, lang='kan')
+        return filename, output_txt_path, kannada_text.strip(), None
+    except Exception as e:
+        return filename, output_txt_path, None, e
+
+def _ocr_batch(image_dir, filenames):
+    """
+    OCRs several images with a single tesseract run, by passing it a list file of image paths.
+    Returns one _ocr_image-style result per image. Falls back to OCRing the images one by one if the
+    run fails or its pages can't be matched up with the images (e.g. a multi-page TIFF).
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as list_file:
+        list_file.write("\n".join(os.path.abspath(os.path.join(image_dir, filename)) for filename in filenames) + "\n")
+    try:
+        pages = pytesseract.image_to_string(list_file.name, lang='kan').split('\f') # Tesseract ends every page with a form feed
+    except Exception as e:
+        print(f"  Batch OCR failed ({e}); falling back to one image at a time.")
+        pages = None
+    finally:
+        os.remove(list_file.name)
+
+    if pages and not pages[-1].strip():
+        pages.pop()
+    if pages is None or len(pages) != len(filenames):
+        return [_ocr_image(image_dir, filename) for filename in filenames]
+    return [
+        (filename, os.path.join(image_dir, f"{os.path.splitext(filename)[0]}.txt"), page.strip(), None)
+        for filename, page in zip(filenames, pages)
+    ]
+
+def generate_translated_ground_truth(image_dir, target_language='en', source_language='kn'):
     """
     Performs OCR on Kannada images, translates the text to English using Google Cloud Translate,
     and saves the translated text as ground truth files.
+    Texts are translated in as few API calls as possible, while the remaining images are still being OCRed.
+    With source_language=None, the language is detected once, from the first few texts, and used for
+    the whole directory (rather than having the API detect it, and bill for it, per text).
     """
-    translate_client = translate.Client(project=PROJECT_ID)
+    translate_client = get_translate_client()
 
     print(f"Starting ground truth generation (OCR and translation to {target_language})...")
 
-    for filename in os.listdir(image_dir):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')):
-            image_path = os.path.join(image_dir, filename)
-            base_filename = os.path.splitext(filename)[0]
+    image_filenames = []
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            base_filename, extension = os.path.splitext(entry.name)
+            if extension.lower() not in IMAGE_EXTENSIONS or not entry.is_file():
+                continue
+            # Incremental runs: non-empty ground truth newer than its image is kept. Empty files (no text,
+            # or an earlier error) are retried.
             output_txt_path = os.path.join(image_dir, f"{base_filename}.txt")
+            if os.path.exists(output_txt_path) and os.path.getsize(output_txt_path) > 0 and os.path.getmtime(output_txt_path) >= entry.stat().st_mtime:
+                print(f"  Up-to-date: {output_txt_path}")
+                continue
+            image_filenames.append(entry.name)
 
-            try:
-                # Step 1: Perform OCR using Tesseract to get Kannada text
-                print(f"  Performing OCR on {filename}...")
-                kannada_text = pytesseract.image_to_string(Image.open(image_path), lang='kan')
-                kannada_text = kannada_text.strip()
+    # Pass 1: OCR every image. The images are OCRed in batches, one tesseract process per batch, with the
+    # batches run in parallel, one per core (limited to one thread each, so they don't oversubscribe the
+    # cores); threads are enough, as the OCR itself runs in those processes. Batches are kept small enough
+    # that every core gets one.
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    print(f"  Performing OCR on {len(image_filenames)} images...")
+    cpu_count = os.cpu_count() or 1
+    batch_size = max(1, min(OCR_BATCH_SIZE, -(-len(image_filenames) // cpu_count)))
+    ocr_batches = [image_filenames[i:i + batch_size] for i in range(0, len(image_filenames), batch_size)]
 
-                if not kannada_text:
-                    print(f"  No Kannada text found in {filename}. Skipping translation.")
-                    with open(output_txt_path, 'w', encoding='utf-8') as f:
-                        f.write("") # Create an empty ground truth file
-                    continue
+    # Pass 2 runs alongside pass 1: OCR results are consumed as they arrive (the workers keep OCRing
+    # ahead), and the texts are translated as soon as a full API batch has built up, so translation
+    # requests overlap with the remaining OCR instead of waiting for all of it.
+    # Translations are kept in a cache next to the images, so reruns over the same texts don't call
+    # (or bill) the API again.
+    with shelve.open(os.path.join(image_dir, TRANSLATION_CACHE_FILENAME)) as translation_cache, ThreadPoolExecutor(max_workers=cpu_count) as executor:
+        # Identical texts (e.g. recurring headers and footers) are translated once and written for
+        # every image they came from: {cache_key: (kannada_text, [(filename, output_txt_path), ...])}
+        pending = {}
+        pending_chars = 0
 
-                # Step 2: Translate Kannada text to target_language (English)
-                print(f"  Translating text from {filename} to {target_language}...")
-                result = translate_client.translate(kannada_text, target_language=target_language, source_language='kn')
-                translated_text = result['translatedText']
+        def translate_pending():
+            """Pass 2: Translates the pending texts to target_language (English), a batch of texts per API call."""
+            nonlocal source_language
+            uncached = list(pending.items())
+            pending.clear()
+            if uncached and source_language is None:
+                try:
+                    detections = translate_client.detect_language([kannada_text for _, (kannada_text, _) in uncached[:LANGUAGE_DETECTION_SAMPLES]])
+                    source_language = Counter(detection['language'] for detection in detections).most_common(1)[0][0]
+                    print(f"  Detected source language: {source_language}")
+                except Exception as e:
+                    print(f"  Error detecting the source language ({e}); the API will detect it per text.")
+            position = 0
+            for batch in _translation_batches([kannada_text for _, (kannada_text, _) in uncached]):
+                entries = uncached[position:position + len(batch)]
+                position += len(batch)
+                print(f"  Translating {len(batch)} texts to {target_language}...")
+                try:
+                    # format_='text' so the translations aren't HTML-escaped
+                    results = translate_client.translate(batch, target_language=target_language, source_language=source_language, format_='text')
+                except Exception as e:
+                    print(f"  Error translating texts from {', '.join(filename for _, (_, outputs) in entries for filename, _ in outputs)}: {e}")
+                    for _, (_, outputs) in entries:
+                        for _, output_txt_path in outputs:
+                            _write_ground_truth(output_txt_path, "")
+                    continue
 
                 # Step 3: Save the translated text as the ground truth file
-                with open(output_txt_path, 'w', encoding='utf-8') as f:
-                    f.write(translated_text)
-                print(f"  Generated ground truth for {filename} (translated to English) at {output_txt_path}")
+                for (cache_key, (_, outputs)), result in zip(entries, results):
+                    translation_cache[cache_key] = result['translatedText']
+                    for filename, output_txt_path in outputs:
+                        _write_ground_truth(output_txt_path, result['translatedText'])
+                        print(f"  Generated ground truth for {filename} (translated to English) at {output_txt_path}")
 
-            except Exception as e:
-                print(f"  Error processing {filename}: {e}")
+        ocr_results = (result for batch_results in executor.map(lambda filenames: _ocr_batch(image_dir, filenames), ocr_batches) for result in batch_results)
+        for filename, output_txt_path, kannada_text, error in ocr_results:
+            if error is not None:
+                print(f"  Error processing {filename}: {error}")
                 # Create an empty ground truth file on error to avoid blocking subsequent steps
-                with open(output_txt_path, 'w', encoding='utf-8') as f:
-                    f.write("")
+                _write_ground_truth(output_txt_path, "")
+                continue
+            if not kannada_text:
+                print(f"  No Kannada text found in {filename}. Skipping translation.")
+                _write_ground_truth(output_txt_path, "") # Create an empty ground truth file
                 continue
 
+            cache_key = _translation_cache_key(kannada_text, target_language)
+            if cache_key in translation_cache:
+                _write_ground_truth(output_txt_path, translation_cache[cache_key])
+                print(f"  Generated ground truth for {filename} (translated to English, cached) at {output_txt_path}")
+            elif cache_key in pending:
+                pending[cache_key][1].append((filename, output_txt_path))
+            else:
+                pending[cache_key] = (kannada_text, [(filename, output_txt_path)])
+                pending_chars += len(kannada_text)
+                if len(pending) >= TRANSLATE_MAX_SEGMENTS or pending_chars >= TRANSLATE_MAX_CHARS:
+                    translate_pending()
+                    pending_chars = 0
+        translate_pending()
+
     print("Ground truth generation complete.")
 
 if __name__ == "__main__":
@@ -70,7 +221,7 @@ if __name__ == "__main__":
 
     # Ensure Google Cloud credentials are set up
     try:
-        translate.Client(project=PROJECT_ID)
+        get_translate_client()
     except Exception as e:
         print(f"Google Cloud credentials not configured correctly or PROJECT_ID is missing/incorrect: {e}")
         print("Please ensure 'PROJECT_ID' in the script is set to your Google Cloud Project ID.")
@@ -1,5 +1,102 @@
 import os
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from tesserocr import PyTessBaseAPI, PSM # Persistent Tesseract API (the tesseract CLI is used as a fallback)
+except ImportError:
+    PyTessBaseAPI = None
+
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'})
+# tesserocr wheels bundle their own libtesseract, which doesn't know where the system's tessdata is
+TESSDATA_PREFIX = os.environ.get('TESSDATA_PREFIX')
+
+# One Tesseract API per worker thread (the API objects aren't thread-safe), so the model is loaded once
+# per thread instead of once per image
+_tess_local = threading.local()
+# Cleared the first time an API fails to initialize, so the remaining images go straight to the CLI
+_tesserocr_available = PyTessBaseAPI is not None
+
+def _get_tess_api():
+    """Returns the calling thread's tesserocr API, or None if tesserocr is missing or can't initialize."""
+    global _tesserocr_available
+    if not _tesserocr_available:
+        return None
+    api = getattr(_tess_local, "api", None)
+    if api is None:
+        api_kwargs = {'path': TESSDATA_PREFIX} if TESSDATA_PREFIX else {}
+        try:
+            # Same settings as "tesseract ... --psm 6 lstm.train"
+            api = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, configs=['lstm.train'], **api_kwargs)
+        except RuntimeError as e:
+            _tesserocr_available = False
+            print(f"  Warning: Could not initialize tesserocr ({e}). Using the tesseract command instead.")
+            return None
+        _tess_local.api = api
+    return api
+
+def _make_lstmf(image_dir, basename, image_path):
+    """
+    Generates the .lstmf file for one image. Returns the lines to print for it, so that output from
+    images processed in parallel isn't interleaved.
+    """
+    ground_truth_path = os.path.join(image_dir, f"{basename}.txt")
+    box_path = os.path.join(image_dir, f"{basename}.box")
+    output_lstmf_path = os.path.join(image_dir, f"{basename}.lstmf")
+
+    if not os.path.exists(image_path):
+        return [f"  Warning: Image file '{image_path}' not found. Skipping .lstmf generation for '{basename}'."]
+    if not os.path.exists(ground_truth_path):
+        return [f"  Warning: Ground truth file '{ground_truth_path}' not found. Skipping .lstmf generation for '{basename}'."]
+    if not os.path.exists(box_path):
+        return [f"  Warning: Box file '{box_path}' not found. Skipping .lstmf generation for '{basename}'."]
+
+    messages = [f"  Generating .lstmf file for {basename}..."]
+    try:
+        api = _get_tess_api()
+        if api is not None:
+            # A stale .lstmf from an earlier run would otherwise hide a failure below
+            if os.path.exists(output_lstmf_path):
+                os.remove(output_lstmf_path)
+            # The output base name is used to find the .box and .txt files, as with the CLI below
+            if api.ProcessPages(os.path.join(image_dir, basename), image_path) and os.path.exists(output_lstmf_path):
+                messages.append(f"  Generated {output_lstmf_path}")
+                return messages
+            messages.append(f"  tesserocr did not write {output_lstmf_path}; retrying with the tesseract command.")
+
+        # Command to generate .lstmf files
+        # tesseract [image_path] [output_base_name] --psm 6 lstm.train
+        # The output_base_name will be used to find .box and .txt files
+        command = [
+            'tesseract',
+            image_path,
+            os.path.join(image_dir, basename), # Tesseract expects output base name without extension
+            '--psm', '6',
+            'lstm.train'
+        ]
+
+        # Single-threaded for the same reason as in generate_box_files.py
+        env = dict(os.environ, OMP_THREAD_LIMIT='1')
+        result = subprocess.run(command, capture_output=True, text=True, check=True, env=env)
+
+        if result.stderr:
+            messages.append(f"  Tesseract stderr for {basename}:\n{result.stderr}")
+
+        if os.path.exists(output_lstmf_path):
+            messages.append(f"  Generated {output_lstmf_path}")
+        else:
+            messages.append(f"  Error: .lstmf file {output_lstmf_path} was not created for {basename}.")
+
+    except subprocess.CalledProcessError as e:
+        messages.append(f"  Error generating .lstmf file for {basename}: {e}")
+        messages.append(f"  Command: {' '.join(e.cmd)}")
+        messages.append(f"  Stdout: {e.stdout}")
+        messages.append(f"  Stderr: {e.stderr}")
+    except Exception as e:
+        messages.append(f"  An unexpected error occurred for {basename}: {e}")
+    return messages
 
 def prepare_training_data(image_dir, lang='kan'):
     """
@@ -9,67 +106,29 @@ def prepare_training_data(image_dir, lang='kan'):
     """
     print(f"Starting training data preparation for language '{lang}'...")
 
-    # Create a list of image base names (without extension)
-    image_basenames = []
-    for filename in os.listdir(image_dir):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')):
-            base_filename = os.path.splitext(filename)[0]
-            image_basenames.append(base_filename)
+    # Map image base names (without extension) to the images' actual paths, whatever their format
+    image_paths = {}
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            base_filename, extension = os.path.splitext(entry.name)
+            if extension.lower() in IMAGE_EXTENSIONS and entry.is_file():
+                image_paths[base_filename] = entry.path
     
-    if not image_basenames:
+    if not image_paths:
         print("No image files found in the directory. Please ensure images are present.")
         return
 
-    # Generate .lstmf files for each image
-    for basename in image_basenames:
-        image_path = os.path.join(image_dir, f"{basename}.jpg") # Assuming .jpg, adjust if other formats are primary
-        ground_truth_path = os.path.join(image_dir, f"{basename}.txt")
-        box_path = os.path.join(image_dir, f"{basename}.box")
-        output_lstmf_path = os.path.join(image_dir, f"{basename}.lstmf")
-
-        if not os.path.exists(image_path):
-            print(f"  Warning: Image file '{image_path}' not found. Skipping .lstmf generation for '{basename}'.")
-            continue
-        if not os.path.exists(ground_truth_path):
-            print(f"  Warning: Ground truth file '{ground_truth_path}' not found. Skipping .lstmf generation for '{basename}'.")
-            continue
-        if not os.path.exists(box_path):
-            print(f"  Warning: Box file '{box_path}' not found. Skipping .lstmf generation for '{basename}'.")
-            continue
+    # Checked up front rather than per image, so nothing is started without it. The command is also
+    # needed with tesserocr, as the fallback for images the API doesn't write an .lstmf for.
+    if shutil.which('tesseract') is None:
+        print("  Error: Tesseract command not found. Please ensure Tesseract OCR is installed and in your system's PATH.")
+        return
 
-        try:
-            # Command to generate .lstmf files
-            # tesseract [image_path] [output_base_name] --psm 6 lstm.train
-            # The output_base_name will be used to find .box and .txt files
-            command = [
-                'tesseract',
-                image_path,
-                os.path.join(image_dir, basename), # Tesseract expects output base name without extension
-                '--psm', '6',
-                'lstm.train'
-            ]
-            
-            print(f"  Generating .lstmf file for {basename}...")
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            
-            if result.stderr:
-                print(f"  Tesseract stderr for {basename}:\n{result.stderr}")
-            
-            if os.path.exists(output_lstmf_path):
-                print(f"  Generated {output_lstmf_path}")
-            else:
-                print(f"  Error: .lstmf file {output_lstmf_path} was not created for {basename}.")
-
-        except subprocess.CalledProcessError as e:
-            print(f"  Error generating .lstmf file for {basename}: {e}")
-            print(f"  Command: {' '.join(e.cmd)}")
-            print(f"  Stdout: {e.stdout}")
-            print(f"  Stderr: {e.stderr}")
-        except FileNotFoundError:
-            print("  Error: Tesseract command not found. Please ensure Tesseract OCR is installed and in your system's PATH.")
-            return # Exit if tesseract is not found
-        except Exception as e:
-            print(f"  An unexpected error occurred for {basename}: {e}")
+    # Generate .lstmf files for each image, in parallel, one tesseract API (or process) per core.
+    # Threads are enough: tesserocr releases the GIL while Tesseract works, and the CLI runs out of process.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for messages in executor.map(lambda item: _make_lstmf(image_dir, *item), image_paths.items()):
+            print("\n".join(messages))
 
     print("Training data preparation complete.")
 
@@ -2,6 +2,7 @@ import os
 import subprocess
 import glob
 import shutil
+import sys
 
 def train_tesseract_model(training_data_dir, lang_code='kan', model_name='kannada_fine_tuned', iterations=1000):
     """
@@ -24,8 +25,7 @@ def train_tesseract_model(training_data_dir, lang_code='kan', model_name='kannad
         return
 
     with open(list_file_path, 'w') as f:
-        for lstmf_file in lstmf_files:
-            f.write(os.path.basename(lstmf_file) + '\n')
+        f.write(''.join(os.path.basename(lstmf_file) + '\n' for lstmf_file in lstmf_files))
 
     print(f"Created list file: {list_file_path}")
 
@@ -63,9 +63,25 @@ def train_tesseract_model(training_data_dir, lang_code='kan', model_name='kannad
         print("Please ensure Tesseract's Kannada language data (kan.traineddata) is installed correctly.")
         return
 
-    # Copy the base traineddata to the training directory
-    shutil.copy(base_traineddata_path, os.path.join(training_data_dir, f"{lang_code}.traineddata"))
-    print(f"Copied '{lang_code}.traineddata' to training directory.")
+    # Make the base traineddata available in the training directory. lstmtraining only reads it, so a
+    # hard link (or a symlink) does instead of a copy; copying is the fallback across drives, or where
+    # links aren't permitted.
+    training_traineddata_path = os.path.join(training_data_dir, f"{lang_code}.traineddata")
+    if os.path.exists(training_traineddata_path) and os.path.samefile(base_traineddata_path, training_traineddata_path):
+        print(f"'{lang_code}.traineddata' is already in the training directory.")
+    else:
+        if os.path.lexists(training_traineddata_path):
+            os.unlink(training_traineddata_path)
+        try:
+            os.link(base_traineddata_path, training_traineddata_path)
+            print(f"Linked '{lang_code}.traineddata' into training directory.")
+        except OSError:
+            try:
+                os.symlink(os.path.abspath(base_traineddata_path), training_traineddata_path)
+                print(f"Linked '{lang_code}.traineddata' into training directory.")
+            except OSError:
+                shutil.copy(base_traineddata_path, training_traineddata_path)
+                print(f"Copied '{lang_code}.traineddata' to training directory.")
 
     # Define the training command
     # Define the training command to generate checkpoints
@@ -79,15 +95,20 @@ def train_tesseract_model(training_data_dir, lang_code='kan', model_name='kannad
 
     try:
         print(f"  Executing training command (this may take a long time): {' '.join(training_command)}")
-        training_process = subprocess.Popen(training_command, cwd=training_data_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        training_process = subprocess.Popen(training_command, cwd=training_data_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
         
-        # Stream output for long-running process
+        # Stream output for long-running process. lstmtraining prints a line per iteration, so the output
+        # is passed through as raw chunks of whatever is available rather than read and printed per line.
+        # (A blocking os.read returns as soon as any output is there, and b'' once the process exits;
+        # unlike a selector, this also works on pipes on Windows.)
+        stdout_fd = training_process.stdout.fileno()
+        sys.stdout.flush() # Text printed so far goes out before the raw bytes
         while True:
-            output = training_process.stdout.readline()
-            if output == '' and training_process.poll() is not None:
+            output = os.read(stdout_fd, 65536)
+            if not output:
                 break
-            if output:
-                print(output.strip())
+            sys.stdout.buffer.write(output)
+            sys.stdout.buffer.flush()
         
         training_process.wait() # Wait for the training process to finish
         